@@ -0,0 +1,110 @@
+import threading
+import bots.api.datanode_async
+import bots.api.types
+
+from typing import Iterable, Optional
+
+
+class AccountsSnapshot:
+    """
+    Balances of accounts grouped by the asset id and indexed by (owner, market_id, type).
+    """
+
+    def __init__(self, accounts: Iterable[bots.api.types.Account] = ()):
+        self._balances: dict[str, dict[tuple[str, str, str], int]] = {}
+        # per asset: account types -> totals, dropped when any account of the asset changes
+        self._totals: dict[str, dict[tuple[str, ...], dict[tuple[str, str], int]]] = {}
+
+        for account in accounts:
+            self.add(account)
+
+    def add(self, account: bots.api.types.Account):
+        if not account.asset in self._balances:
+            self._balances[account.asset] = {}
+
+        self._balances[account.asset][(account.owner, account.market_id, account.type)] = account.balance
+        self._totals.pop(account.asset, None)
+
+    def party_totals(self, asset_id: str, account_types: Iterable[str]) -> dict[tuple[str, str], int]:
+        """
+        Sum of balances of the given account types per (owner, market_id), for all parties of the asset.
+        Totals are aggregated once and reused until any account of the asset changes. Must not be modified.
+        """
+        types_key = tuple(sorted(account_types))
+        asset_totals = self._totals.setdefault(asset_id, {})
+        if not types_key in asset_totals:
+            totals: dict[tuple[str, str], int] = {}
+            for (owner, market_id, account_type), balance in self._balances.get(asset_id, {}).items():
+                if account_type in types_key:
+                    totals[(owner, market_id)] = totals.get((owner, market_id), 0) + balance
+
+            asset_totals[types_key] = totals
+
+        return asset_totals[types_key]
+
+
+class BalanceIndex(AccountsSnapshot):
+    """
+    Balances of the tracked parties, updated in place from the account updates streams of the parties.
+    A party becomes ready once the whole snapshot of its accounts is received.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parties: frozenset[str] = frozenset()
+        self._ready_parties: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def parties(self) -> frozenset[str]:
+        return self._parties
+
+    def track_parties(self, parties: Iterable[str]):
+        with self._lock:
+            self._parties = frozenset(parties)
+            self._ready_parties &= self._parties
+
+    def apply(self, party_id: str, update: bots.api.types.AccountsUpdate):
+        with self._lock:
+            if not party_id in self._parties:
+                return
+
+            for account in update.accounts:
+                if account.owner == party_id:
+                    self.add(account)
+
+            if update.snapshot and update.last_page:
+                self._ready_parties.add(party_id)
+
+    def party_totals(self, asset_id: str, account_types: Iterable[str]) -> dict[tuple[str, str], int]:
+        # the stream updates balances in place
+        with self._lock:
+            return super().party_totals(asset_id, account_types)
+
+    def mark_not_ready(self, party_id: str):
+        with self._lock:
+            self._ready_parties.discard(party_id)
+
+    def covers(self, parties: Iterable[str]) -> bool:
+        """
+        True when balances of all given parties are kept current by the streams.
+        """
+        with self._lock:
+            return self._ready_parties.issuperset(parties)
+
+
+def fetch_accounts_snapshot(
+    endpoints: list[str], asset_ids: list[str], parties: list[str], page_size: Optional[int] = None
+) -> AccountsSnapshot:
+    """
+    Download accounts of all given parties for all given assets in one pass,
+    chunks of parties are queried concurrently.
+    """
+    snapshot = AccountsSnapshot()
+    if len(asset_ids) < 1 or len(parties) < 1:
+        return snapshot
+
+    for account in bots.api.datanode_async.get_parties_accounts(endpoints, parties, asset_ids, page_size=page_size):
+        snapshot.add(account)
+
+    return snapshot
@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional
+
+
+@dataclass
+class CatalogEntry:
+    items: list[dict[str, any]]
+    # validators returned by the data-node, used for the conditional revalidation
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # unix timestamp of the last download or successful revalidation
+    fetched_at: float
+
+
+class CatalogCache:
+    """
+    Cache for rarely changing data-node catalogs (markets, assets).
+
+    Entries are served from memory until their TTL expires, then the refresh function
+    revalidates them. When snapshot_dir is set, every entry is also written to disk and
+    loaded from there after the restart.
+    """
+
+    logger = logging.getLogger("catalog-cache")
+
+    def __init__(self, ttls: dict[str, float], snapshot_dir: Optional[str] = None):
+        self._ttls = ttls
+        self._snapshot_dir = snapshot_dir
+        self._entries: dict[str, CatalogEntry] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_mutex = threading.Lock()
+
+    def _lock(self, resource: str) -> threading.Lock:
+        with self._locks_mutex:
+            if not resource in self._locks:
+                self._locks[resource] = threading.Lock()
+
+            return self._locks[resource]
+
+    def _snapshot_path(self, resource: str) -> str:
+        return os.path.join(self._snapshot_dir, f"{resource}.json")
+
+    def _load_snapshot(self, resource: str) -> Optional[CatalogEntry]:
+        if self._snapshot_dir is None or not os.path.exists(self._snapshot_path(resource)):
+            return None
+
+        try:
+            with open(self._snapshot_path(resource), "r") as file:
+                return CatalogEntry(**json.load(file))
+        except Exception as e:
+            CatalogCache.logger.warning(f"Ignoring invalid {resource} snapshot: {str(e)}")
+            return None
+
+    def _save_snapshot(self, resource: str, entry: CatalogEntry):
+        if self._snapshot_dir is None:
+            return
+
+        try:
+            os.makedirs(self._snapshot_dir, exist_ok=True)
+            tmp_path = f"{self._snapshot_path(resource)}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(asdict(entry), file)
+            os.replace(tmp_path, self._snapshot_path(resource))
+        except Exception as e:
+            CatalogCache.logger.warning(f"Failed to save the {resource} snapshot: {str(e)}")
+
+    def get(self, resource: str, refresh: Callable[[Optional[CatalogEntry]], CatalogEntry]) -> list[dict[str, any]]:
+        """
+        Returns cached items for the resource. When the entry is missing or expired,
+        refresh is called with the current entry (or None) and its result is cached.
+        """
+        with self._lock(resource):
+            entry = self._entries.get(resource, None)
+            if entry is None:
+                entry = self._load_snapshot(resource)
+
+            ttl = self._ttls.get(resource, 0.0)
+            if not entry is None and time.time() - entry.fetched_at < ttl:
+                return list(entry.items)
+
+            new_entry = refresh(entry)
+            self._entries[resource] = new_entry
+            self._save_snapshot(resource, new_entry)
+
+            return list(new_entry.items)
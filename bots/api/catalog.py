@@ -0,0 +1,130 @@
+import time
+
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+
+@dataclass(frozen=True)
+class MarketRecord:
+    id: str
+    # name of the instrument, scenarios refer to markets by it
+    name: str
+    state: str
+    # instrument metadata tags split into key and value, e.g: "base:BTC" -> {"base": "BTC"}
+    tags: dict[str, str]
+    # the settlement asset of futures and perpetuals, quote and base assets of spot markets
+    asset_ids: tuple[str, ...]
+    # the base tag, or the ticker tag when the market has no base tag
+    base: str
+    quote: str
+
+
+@dataclass(frozen=True)
+class AssetRecord:
+    id: str
+    symbol: str
+    decimals: int
+    # 10^decimals, balances are divided by it
+    scale: int
+    status: str
+    # None for assets which are not ERC20 tokens
+    erc20_address: Optional[str]
+
+
+def _market_tags(instrument: dict[str, any]) -> dict[str, str]:
+    tags = dict()
+    for item in instrument.get("metadata", {}).get("tags", []):
+        parts = item.split(":")
+        if len(parts) >= 2:
+            tags[parts[0]] = parts[1]
+
+    return tags
+
+
+def _market_asset_ids(instrument: dict[str, any]) -> tuple[str, ...]:
+    if "future" in instrument:
+        return (instrument["future"]["settlementAsset"],)
+
+    if "perpetual" in instrument:
+        return (instrument["perpetual"]["settlementAsset"],)
+
+    if "spot" in instrument:
+        return (instrument["spot"]["quoteAsset"], instrument["spot"]["baseAsset"])
+
+    return ()
+
+
+def market_record_from_node(node: dict[str, any]) -> MarketRecord:
+    instrument = node.get("tradableInstrument", {}).get("instrument", {})
+    tags = _market_tags(instrument)
+
+    return MarketRecord(
+        id=node["id"],
+        name=instrument.get("name", ""),
+        state=node.get("state", ""),
+        tags=tags,
+        asset_ids=_market_asset_ids(instrument),
+        base=tags.get("base", tags.get("ticker", "")),
+        quote=tags.get("quote", ""),
+    )
+
+
+def asset_record_from_node(node: dict[str, any]) -> AssetRecord:
+    details = node.get("details", {})
+    decimals = int(details.get("decimals", 0))
+
+    return AssetRecord(
+        id=node["id"],
+        symbol=details.get("symbol", ""),
+        decimals=decimals,
+        scale=pow(10, decimals),
+        status=node.get("status", ""),
+        erc20_address=details["erc20"]["contractAddress"] if "erc20" in details else None,
+    )
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    # all markets by the market id
+    markets_by_id: dict[str, MarketRecord] = field(default_factory=dict)
+    # markets which are not excluded by their state, by the instrument name
+    markets: dict[str, MarketRecord] = field(default_factory=dict)
+    assets: dict[str, AssetRecord] = field(default_factory=dict)
+    # unix timestamp of the refresh which changed the catalog
+    updated_at: float = 0.0
+
+
+def build_catalog_snapshot(
+    previous: CatalogSnapshot,
+    market_nodes: Iterable[dict[str, any]],
+    asset_nodes: Iterable[dict[str, any]],
+    exclude_states: Iterable[str] = (),
+) -> CatalogSnapshot:
+    """
+    Returns the catalog of given markets and assets. Records of markets and assets whose id and state
+    did not change are reused from the previous snapshot, the previous snapshot is returned when nothing changed.
+    """
+    markets_by_id = dict()
+    for node in market_nodes:
+        record = previous.markets_by_id.get(node["id"], None)
+        if record is None or record.state != node.get("state", ""):
+            record = market_record_from_node(node)
+        markets_by_id[record.id] = record
+
+    assets = dict()
+    for node in asset_nodes:
+        record = previous.assets.get(node["id"], None)
+        if record is None or record.status != node.get("status", ""):
+            record = asset_record_from_node(node)
+        assets[record.id] = record
+
+    if markets_by_id == previous.markets_by_id and assets == previous.assets:
+        return previous
+
+    return CatalogSnapshot(
+        markets_by_id=markets_by_id,
+        # later markets with the same name replace earlier ones
+        markets={record.name: record for record in markets_by_id.values() if not record.state in exclude_states},
+        assets=assets,
+        updated_at=time.time(),
+    )
@@ -1,75 +1,236 @@
+import time
 import requests
+import urllib.parse
 import logging
+import bots.api.http
+import bots.api.metrics
 import bots.api.types
+import bots.config.types
+
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Iterator, Optional
+from bots.api.cache import CatalogCache, CatalogEntry
+from bots.api.hedging import Hedger
+from bots.api.http import conditional_get_call, get_call, metric_labels
+from bots.api.selector import EndpointSelector
+
+
+DEFAULT_PROBE_TIMEOUT = 5.0
+DEFAULT_MAX_ALLOWED_LAG_BLOCKS = 500
+# party ids are 64 characters long, 50 of them keep the URL below 4KB
+DEFAULT_PARTIES_CHUNK_SIZE = 50
+
+# shared by all data-node calls, keeps latency and errors of every endpoint
+selector = EndpointSelector()
+# markets and assets rarely change, they are cached and revalidated after the TTL
+catalog_cache = CatalogCache({"markets": 60.0, "assets": 300.0})
+# set when the gRPC backend is selected, markets, assets and accounts are then fetched over gRPC
+grpc_client = None
+# set when hedging is enabled, slow requests are then sent to the second best endpoint as well
+hedger = None
+
+
+def configure(
+    config: bots.config.types.DataNodeConfig,
+    catalog_snapshot_dir: Optional[str] = None,
+    grpc_hosts: Optional[list[str]] = None,
+):
+    global selector, catalog_cache, grpc_client, hedger
+
+    bots.api.http.configure(config)
+    selector = EndpointSelector(
+        alpha=config.latency_ewma_alpha,
+        failure_threshold=config.circuit_failure_threshold,
+        cooldown=config.circuit_cooldown,
+    )
+    catalog_cache = CatalogCache(
+        {"markets": config.markets_cache_ttl, "assets": config.assets_cache_ttl},
+        catalog_snapshot_dir,
+    )
+
+    hedger = None
+    if config.hedging:
+        hedger = Hedger(percentile=config.hedge_latency_percentile, min_delay=config.hedge_min_delay)
+
+    grpc_client = None
+    if config.backend == "grpc":
+        if grpc_hosts is None or len(grpc_hosts) < 1:
+            raise ValueError("The gRPC data-node backend is selected, but the network config has no gRPC hosts")
+
+        # grpc is required only for this backend
+        from bots.api.datanode_grpc import GrpcDataNodeClient
+
+        grpc_client = GrpcDataNodeClient(
+            grpc_hosts,
+            channels_per_host=config.grpc_channels_per_host,
+            timeout=config.read_timeout,
+        )
+    elif config.backend != "rest":
+        raise ValueError(f"Unknown data-node backend: {config.backend}, supported backends: rest, grpc")
+
+
+def _call_endpoint(
+    endpoint: str, url: str, required_key: str, route: Optional[str] = None
+) -> Optional[tuple[any, dict[str, str]]]:
+    """
+    Call the url on a single endpoint and record the result in the selector, latency under the route.
+    Returns None when the call fails, or the response does not contain the required_key.
+    """
+    started = time.monotonic()
+    try:
+        response = get_call(f"{endpoint}/{url}")
+    except:
+        selector.record_failure(endpoint)
+        return None
+
+    if len(response) < 1 or not required_key in response[0]:
+        bots.api.metrics.request_errors.inc(**metric_labels(f"{endpoint}/{url}"))
+        selector.record_failure(endpoint)
+        return None
+
+    selector.record_success(endpoint, time.monotonic() - started, route)
+    return response
+
+
+def _route(url: str) -> str:
+    """
+    Returns the route label of the url relative to the endpoint, e.g: api/v2/accounts?... -> api/v2/accounts.
+    """
+    return url.split("?", 1)[0].strip("/")
+
+
+def _get_from_endpoints(endpoints: list[str], url: str, required_key: str) -> tuple[any, dict[str, str]]:
+    """
+    Call the url on endpoints ordered by the selector, until one of them
+    returns a response containing the required_key.
+    """
+    ordered_endpoints = selector.order(endpoints)
+    route = _route(url)
+
+    if not hedger is None and len(ordered_endpoints) > 1:
+        response = hedger.call(
+            ordered_endpoints[0],
+            ordered_endpoints[1],
+            lambda endpoint: _call_endpoint(endpoint, url, required_key, route),
+            selector.latency_percentile(ordered_endpoints[0], hedger.percentile, route),
+        )
+        if not response is None:
+            return response
 
+        bots.api.metrics.fallbacks.inc(route=route)
+        ordered_endpoints = ordered_endpoints[2:]
 
-from typing import Optional
-from bots.api.http import get_call
+    for idx, endpoint in enumerate(ordered_endpoints):
+        if idx > 0:
+            bots.api.metrics.fallbacks.inc(route=route)
 
+        response = _call_endpoint(endpoint, url, required_key, route)
+        if not response is None:
+            return response
 
-def get_max_core_height(endpoints: list[str]) -> int:
-    max_height = 0
-    for endpoint in endpoints:
-        try:
-            # get statistics for each endpoints
-            stats = get_statistics([endpoint])
-            if "blockHeight" in stats and int(stats["blockHeight"]) > max_height:
-                max_height = int(stats["blockHeight"])
-        except:
-            pass  # we do not care about errors here...
+    raise requests.RequestException(f"all endpoints for /{url} did not return a valid response")
 
-    if max_height < 1:
-        raise requests.RequestException(
-            "cannot get max network height, all available nodes did not return valid response for the /statistics endpoint"
-        )
 
-    return max_height
+def _probe_endpoint(endpoint: str, timeout: float) -> Optional[bots.api.types.EndpointHealth]:
+    started = time.monotonic()
+    try:
+        response = get_call(f"{endpoint}/statistics", timeout=timeout)
+    except Exception as e:
+        logging.debug(f"Health probe for {endpoint} failed: {str(e)}")
+        selector.record_failure(endpoint)
+        return None
 
+    if len(response) < 1 or not "statistics" in response[0] or not "blockHeight" in response[0]["statistics"]:
+        selector.record_failure(endpoint)
+        return None
 
-def get_healthy_endpoints(endpoints: list[str]) -> list[str]:
-    max_allowed_lag_blocks = 500
-    result = []
+    selector.record_success(endpoint, time.monotonic() - started, "statistics")
 
-    max_core_height = get_max_core_height(endpoints)
+    data_node_height = None
+    if len(response) > 1 and "x-block-height" in response[1]:
+        data_node_height = int(response[1]["x-block-height"])
 
-    for endpoint in endpoints:
-        try:
-            stats = get_statistics([endpoint])
+    return bots.api.types.EndpointHealth(
+        endpoint=endpoint,
+        core_height=int(response[0]["statistics"]["blockHeight"]),
+        data_node_height=data_node_height,
+        latency=time.monotonic() - started,
+    )
 
-            if not "blockHeight" in stats:
-                continue
 
-            core_height = int(stats["blockHeight"])
-            if core_height < max_core_height and max_core_height - core_height > max_allowed_lag_blocks:
-                continue
+def probe_endpoints(
+    endpoints: list[str], timeout: float = DEFAULT_PROBE_TIMEOUT
+) -> list[bots.api.types.EndpointHealth]:
+    """
+    Fetch /statistics from all endpoints in parallel. Endpoints that fail, or do
+    not answer within the timeout are not included in the result.
+    """
+    if len(endpoints) < 1:
+        return []
 
-            # if data-node check its block as well
-            if "x-block-height" in stats:
-                data_node_height = int(stats["x-block-height"])
+    executor = ThreadPoolExecutor(max_workers=len(endpoints), thread_name_prefix="endpoint-probe")
+    futures = [executor.submit(_probe_endpoint, endpoint, timeout) for endpoint in endpoints]
+    done, _ = wait(futures, timeout=timeout)
+    # do not wait for blackholed hosts, their threads finish on the request timeout
+    executor.shutdown(wait=False, cancel_futures=True)
 
-                if data_node_height < max_core_height and max_core_height - data_node_height > max_allowed_lag_blocks:
-                    continue
+    return [future.result() for future in futures if future in done and not future.result() is None]
 
-            result.append(endpoint)
-        except:
-            pass
 
-    return result
+def rank_endpoints(
+    probes: list[bots.api.types.EndpointHealth], max_allowed_lag_blocks: int = DEFAULT_MAX_ALLOWED_LAG_BLOCKS
+) -> list[bots.api.types.EndpointHealth]:
+    """
+    Drop endpoints lagging more than max_allowed_lag_blocks behind the highest
+    core height in the probes, and sort the rest from the least lagging and fastest one.
+    """
+    if len(probes) < 1:
+        return []
 
+    max_core_height = max(probe.core_height for probe in probes)
 
-def get_markets(endpoints: list[str], exclude_statuses = []) -> any:
-    for endpoint in endpoints:
-        try:
-            json_resp = get_call(f"{endpoint}/api/v2/markets")[0]
-        except:
+    result = []
+    for probe in probes:
+        if max_core_height - probe.core_height > max_allowed_lag_blocks:
             continue
 
-        if not "markets" in json_resp:
+        # if data-node check its block as well
+        if not probe.data_node_height is None and max_core_height - probe.data_node_height > max_allowed_lag_blocks:
             continue
 
-        return [market["node"] for market in json_resp["markets"]["edges"] if market["node"]['state'] not in exclude_statuses]
+        result.append(probe)
+
+    return sorted(result, key=lambda probe: (max_core_height - probe.height, probe.latency))
 
-    raise requests.RequestException("all endpoints for /api/v2/markets did not return a valid response")
+
+def get_max_core_height(endpoints: list[str], timeout: float = DEFAULT_PROBE_TIMEOUT) -> int:
+    probes = probe_endpoints(endpoints, timeout)
+    max_height = max([probe.core_height for probe in probes], default=0)
+
+    if max_height < 1:
+        raise requests.RequestException(
+            "cannot get max network height, all available nodes did not return valid response for the /statistics endpoint"
+        )
+
+    return max_height
+
+
+def get_healthy_endpoints(
+    endpoints: list[str],
+    max_allowed_lag_blocks: int = DEFAULT_MAX_ALLOWED_LAG_BLOCKS,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+) -> list[str]:
+    """
+    Returns endpoints which are not lagging behind the network, ordered from the best one.
+    """
+    probes = probe_endpoints(endpoints, timeout)
+
+    return [probe.endpoint for probe in rank_endpoints(probes, max_allowed_lag_blocks)]
+
+
+def get_markets(endpoints: list[str], exclude_statuses = []) -> any:
+    return [market for market in _get_catalog(endpoints, "markets") if market["state"] not in exclude_statuses]
 
 
 def check_market_exists(endpoints: list[str], market_names: list[str]):
@@ -84,48 +245,180 @@ def check_market_exists(endpoints: list[str], market_names: list[str]):
 
 
 def get_statistics(endpoints: list[str]) -> dict[str, any]:
-    response = ([], dict())
-    for endpoint in endpoints:
-        try:
-            response = get_call(f"{endpoint}/statistics")
-        except:
-            continue
+    response = _get_from_endpoints(endpoints, "statistics", "statistics")
 
-        if len(response) < 1 or "statistics" not in response[0]:
-            continue
+    result = response[0]["statistics"]
+    # append data-node height to the response
+    if len(response) > 1 and "x-block-height" in response[1]:
+        result["x-block-height"] = response[1]["x-block-height"]
+
+    return result
 
-        result = response[0]["statistics"]
-        # append data-node height to the response
-        if len(response) > 1 and "x-block-height" in response[1]:
-            result["x-block-height"] = response[1]["x-block-height"]
 
-        return result
+def get_assets(endpoints: list[str]) -> dict[str, any]:
+    return _get_catalog(endpoints, "assets")
 
-    raise requests.RequestException("all endpoints for /statistics did not return a valid response")
 
+def _get_catalog(endpoints: list[str], connection: str) -> list[dict[str, any]]:
+    path = f"api/v2/{connection}"
 
-def get_assets(endpoints: list[str]) -> dict[str, any]:
-    for endpoint in endpoints:
+    def refresh(entry: Optional[CatalogEntry]) -> CatalogEntry:
+        if not grpc_client is None:
+            items = list(grpc_client.get_markets() if connection == "markets" else grpc_client.get_assets())
+            return CatalogEntry(items=items, etag=None, last_modified=None, fetched_at=time.time())
+
+        page, headers = _revalidate_first_page(endpoints, path, connection, entry)
+        if page is None:
+            logging.debug(f"The /{path} catalog has not been modified")
+            return CatalogEntry(
+                items=entry.items, etag=entry.etag, last_modified=entry.last_modified, fetched_at=time.time()
+            )
+
+        items = [edge["node"] for edge in page.get("edges", []) if "node" in edge]
+        next_cursor = _next_cursor(page)
+        if not next_cursor is None:
+            items = items + list(paginate(endpoints, path, connection, after_cursor=next_cursor))
+
+        # validators cover only the first page, changes on later pages would not be seen after 304
+        single_page = next_cursor is None
+        return CatalogEntry(
+            items=items,
+            etag=headers.get("ETag", None) if single_page else None,
+            last_modified=headers.get("Last-Modified", None) if single_page else None,
+            fetched_at=time.time(),
+        )
+
+    return catalog_cache.get(connection, refresh)
+
+
+def _revalidate_first_page(
+    endpoints: list[str], path: str, connection: str, entry: Optional[CatalogEntry]
+) -> tuple[Optional[dict[str, any]], dict[str, str]]:
+    """
+    Fetch the first page of the catalog, with the validators of the cached entry.
+    Returns None as the page, when the data-node confirms the entry is not modified.
+    """
+    etag = None if entry is None else entry.etag
+    last_modified = None if entry is None else entry.last_modified
+
+    for idx, endpoint in enumerate(selector.order(endpoints)):
+        if idx > 0:
+            bots.api.metrics.fallbacks.inc(route=path)
+
+        started = time.monotonic()
         try:
-            json_resp = get_call(f"{endpoint}/api/v2/assets")[0]
+            json_resp, headers = conditional_get_call(f"{endpoint}/{path}", etag, last_modified)
         except:
+            selector.record_failure(endpoint)
             continue
 
-        if not "assets" in json_resp:
+        if json_resp is None:
+            selector.record_success(endpoint, time.monotonic() - started, path)
+            return (None, headers)
+
+        if not connection in json_resp:
+            bots.api.metrics.request_errors.inc(**metric_labels(f"{endpoint}/{path}"))
+            selector.record_failure(endpoint)
             continue
 
-        return [asset["node"] for asset in json_resp["assets"]["edges"]]
+        selector.record_success(endpoint, time.monotonic() - started, path)
+        return (json_resp[connection], headers)
 
-    raise requests.RequestException("all endpoints for /statistics did not return a valid response")
+    raise requests.RequestException(f"all endpoints for /{path} did not return a valid response")
 
 
-def get_accounts(
+def _get_page(endpoints: list[str], url: str, connection: str) -> dict[str, any]:
+    return _get_from_endpoints(endpoints, url, connection)[0][connection]
+
+
+def _page_url(path: str, query: Optional[list[str]], page_size: Optional[int], cursor: Optional[str]) -> str:
+    page_query = [] if query is None else list(query)
+    if not page_size is None:
+        page_query = page_query + [f"pagination.first={page_size}"]
+
+    if not cursor is None:
+        page_query = page_query + [f"pagination.after={urllib.parse.quote(cursor, safe='')}"]
+
+    return path if len(page_query) < 1 else f"{path}?{'&'.join(page_query)}"
+
+
+def _next_cursor(page: dict[str, any]) -> Optional[str]:
+    page_info = page.get("pageInfo", {})
+
+    return page_info.get("endCursor", None) if page_info.get("hasNextPage", False) else None
+
+
+def paginate(
     endpoints: list[str],
+    path: str,
+    connection: str,
+    query: Optional[list[str]] = None,
+    page_size: Optional[int] = None,
+    after_cursor: Optional[str] = None,
+    prefetch: bool = True,
+) -> Iterator[dict[str, any]]:
+    """
+    Iterate over nodes of the paginated list endpoint, e.g: /api/v2/accounts.
+    Pages are followed through pageInfo.endCursor, when prefetch is enabled,
+    the next page is downloaded in the background while the current one is consumed.
+    """
+
+    def fetch(cursor: Optional[str]) -> dict[str, any]:
+        return _get_page(endpoints, _page_url(path, query, page_size, cursor), connection)
+
+    return iterate_pages(fetch, after_cursor, prefetch, route=path)
+
+
+def iterate_pages(
+    fetch: Callable[[Optional[str]], dict[str, any]],
+    after_cursor: Optional[str] = None,
+    prefetch: bool = True,
+    route: Optional[str] = None,
+) -> Iterator[dict[str, any]]:
+    """
+    Iterate over nodes of pages returned by fetch(cursor). Every page is a connection
+    with edges and pageInfo, in the format returned by the data-node REST API.
+    When route is set, the number of downloaded pages is recorded in the metrics.
+    """
+    pages = 0
+
+    def counted_fetch(cursor: Optional[str]) -> dict[str, any]:
+        nonlocal pages
+        page = fetch(cursor)
+        pages += 1
+        return page
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="paginator") if prefetch else None
+    try:
+        page = counted_fetch(after_cursor)
+        while True:
+            next_cursor = _next_cursor(page)
+            next_page = None
+            if not next_cursor is None and not executor is None:
+                next_page = executor.submit(counted_fetch, next_cursor)
+
+            for edge in page.get("edges", []):
+                if not "node" in edge:
+                    continue
+                yield edge["node"]
+
+            if next_cursor is None:
+                return
+
+            page = next_page.result() if not next_page is None else counted_fetch(next_cursor)
+    finally:
+        if not executor is None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not route is None and pages > 0:
+            bots.api.metrics.pagination_pages.observe(pages, route=route)
+
+
+def _accounts_query(
     asset_id: Optional[str] = None,
     parties: Optional[list[str]] = None,
     market_ids: Optional[list[str]] = None,
-    afterCursor: Optional[str] = None,
-) -> list[bots.api.types.Account]:
+) -> list[str]:
     query = []
 
     if not asset_id is None:
@@ -139,47 +432,109 @@ def get_accounts(
         markets_list = ",".join(market_ids)
         query = query + [f"filter.marketIds={markets_list}"]
 
-    if not afterCursor is None:
-        query = query + [f"pagination.after={afterCursor}"]
+    return query
 
-    url = "api/v2/accounts"
 
-    if len(query) > 0:
-        query_str = "&".join(query)
-        url = f"{url}?{query_str}"
+def _account_from_node(node: dict[str, any]) -> bots.api.types.Account:
+    return bots.api.types.Account(
+        owner=node["owner"],
+        balance=int(node["balance"]),
+        asset=node["asset"],
+        market_id=node.get("marketId", ""),
+        type=node["type"],
+    )
 
-    for endpoint in endpoints:
-        try:
-            json_resp = get_call(f"{endpoint}/{url}")[0]
-        except:
-            continue
 
-        if not "accounts" in json_resp:
-            continue
+def iter_accounts(
+    endpoints: list[str],
+    asset_id: Optional[str] = None,
+    parties: Optional[list[str]] = None,
+    market_ids: Optional[list[str]] = None,
+    afterCursor: Optional[str] = None,
+    page_size: Optional[int] = None,
+) -> Iterator[bots.api.types.Account]:
+    if not grpc_client is None:
+        yield from grpc_client.iter_accounts(asset_id, parties, market_ids, afterCursor, page_size)
+        return
 
-        response = []
-        for edge in json_resp["accounts"]["edges"]:
-            if not "node" in edge:
-                continue
-            response.append(
-                bots.api.types.Account(
-                    owner=edge["node"]["owner"],
-                    balance=int(edge["node"]["balance"]),
-                    asset=edge["node"]["asset"],
-                    market_id=edge["node"]["marketId"],
-                    type=edge["node"]["type"],
-                )
-            )
+    query = _accounts_query(asset_id, parties, market_ids)
+
+    for node in paginate(endpoints, "api/v2/accounts", "accounts", query, page_size, afterCursor):
+        yield _account_from_node(node)
+
+
+def get_accounts(
+    endpoints: list[str],
+    asset_id: Optional[str] = None,
+    parties: Optional[list[str]] = None,
+    market_ids: Optional[list[str]] = None,
+    afterCursor: Optional[str] = None,
+    page_size: Optional[int] = None,
+) -> list[bots.api.types.Account]:
+    return list(iter_accounts(endpoints, asset_id, parties, market_ids, afterCursor, page_size))
 
-        if (
-            "pageInfo" in json_resp["accounts"]
-            and "hasNextPage" in json_resp["accounts"]["pageInfo"]
-            and json_resp["accounts"]["pageInfo"]["hasNextPage"]
-        ):
-            return response + get_accounts(
-                endpoints, asset_id, parties, market_ids, json_resp["accounts"]["pageInfo"]["endCursor"]
-            )
 
-        return response
+def _parties_chunks(parties: list[str], chunk_size: int) -> list[list[str]]:
+    unique_parties = sorted(set(parties))
+
+    return [unique_parties[idx : idx + chunk_size] for idx in range(0, len(unique_parties), chunk_size)]
+
+
+def _accounts_update_from_message(message: dict[str, any]) -> Optional[bots.api.types.AccountsUpdate]:
+    if "snapshot" in message:
+        return bots.api.types.AccountsUpdate(
+            accounts=[_account_from_node(node) for node in message["snapshot"].get("accounts", [])],
+            snapshot=True,
+            last_page=bool(message["snapshot"].get("lastPage", False)),
+        )
+
+    if "updates" in message:
+        return bots.api.types.AccountsUpdate(
+            accounts=[_account_from_node(node) for node in message["updates"].get("accounts", [])],
+            snapshot=False,
+            last_page=False,
+        )
 
-    raise requests.RequestException("all endpoints for /api/v2/assets did not return a valid response")
+    return None
+
+
+def observe_accounts(
+    endpoints: list[str], party_id: str, read_timeout: Optional[float] = None
+) -> Iterator[bots.api.types.AccountsUpdate]:
+    """
+    Subscribe to the account updates stream of the party on the best data-node. The stream starts
+    with the snapshot of current balances of the party, followed by live updates. The data-node
+    is recorded as failed when the stream ends before its first message.
+    """
+    if not grpc_client is None:
+        for message in grpc_client.observe_accounts(party_id):
+            update = _accounts_update_from_message(message)
+            if not update is None:
+                yield update
+        return
+
+    ordered_endpoints = selector.order(endpoints)
+    if len(ordered_endpoints) < 1:
+        raise requests.RequestException("There is no data-node to stream accounts from")
+
+    endpoint = ordered_endpoints[0]
+    route = "api/v2/stream/accounts"
+    started = time.monotonic()
+    connected = False
+    try:
+        for message in bots.api.http.stream_call(f"{endpoint}/{route}?partyId={party_id}", timeout=read_timeout):
+            if not connected:
+                # the stream is open as long as it is read, only the time to the first message is its latency
+                selector.record_success(endpoint, time.monotonic() - started, route)
+                connected = True
+
+            update = _accounts_update_from_message(message)
+            if not update is None:
+                yield update
+    except Exception:
+        if not connected:
+            selector.record_failure(endpoint)
+        raise
+
+    if not connected:
+        selector.record_failure(endpoint)
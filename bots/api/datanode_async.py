@@ -0,0 +1,345 @@
+import asyncio
+import requests
+import bots.api.datanode
+import bots.api.metrics
+import bots.api.types
+import bots.config.types
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+from bots.api.datanode import (
+    DEFAULT_MAX_ALLOWED_LAG_BLOCKS,
+    DEFAULT_PARTIES_CHUNK_SIZE,
+    DEFAULT_PROBE_TIMEOUT,
+    _account_from_node,
+    _accounts_query,
+    _call_endpoint,
+    _next_cursor,
+    _page_url,
+    _parties_chunks,
+    _probe_endpoint,
+    _route,
+    rank_endpoints,
+)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_CONCURRENCY_PER_HOST = 4
+
+_max_concurrency_per_host = DEFAULT_MAX_CONCURRENCY_PER_HOST
+
+
+def configure(config: bots.config.types.DataNodeConfig):
+    global _max_concurrency_per_host
+
+    _max_concurrency_per_host = config.max_concurrency_per_host
+
+
+class AsyncDataNodeClient:
+    """
+    asyncio client mirroring bots.api.datanode.
+
+    Requests go through the same pooled HTTP client and endpoint selector as the
+    blocking API, each of them in a worker thread. The number of concurrent requests
+    per data-node is bounded by a semaphore. A client is bound to a single event loop.
+    """
+
+    def __init__(self, max_concurrency_per_host: int = DEFAULT_MAX_CONCURRENCY_PER_HOST):
+        self._max_concurrency_per_host = max_concurrency_per_host
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        if not endpoint in self._semaphores:
+            self._semaphores[endpoint] = asyncio.Semaphore(self._max_concurrency_per_host)
+
+        return self._semaphores[endpoint]
+
+    async def _call_endpoint(
+        self,
+        endpoint: str,
+        url: str,
+        required_key: str,
+        route: Optional[str] = None,
+        executor: Optional[Executor] = None,
+    ) -> Optional[tuple[any, dict[str, str]]]:
+        async with self._semaphore(endpoint):
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, _call_endpoint, endpoint, url, required_key, route
+            )
+
+    async def _hedged_call(
+        self, primary: str, secondary: str, url: str, required_key: str, route: Optional[str], delay: float
+    ) -> Optional[tuple[any, dict[str, str]]]:
+        """
+        Async version of bots.api.hedging.Hedger.call, the loser task is cancelled.
+        Calls run in the hedger executor, so the loser request left running in its thread
+        does not hold the event loop shutdown.
+        """
+        hedger = bots.api.datanode.hedger
+        primary_task = asyncio.create_task(self._call_endpoint(primary, url, required_key, route, hedger.executor))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if primary_task in done:
+            response = primary_task.result()
+            return response if not response is None else await self._call_endpoint(secondary, url, required_key, route)
+
+        hedger.record_sent()
+        secondary_task = asyncio.create_task(self._call_endpoint(secondary, url, required_key, route, hedger.executor))
+        pending = {primary_task, secondary_task}
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                response = task.result()
+                if response is None:
+                    continue
+
+                if task is secondary_task:
+                    hedger.record_won()
+
+                for loser in pending:
+                    loser.cancel()
+
+                return response
+
+        return None
+
+    async def _get_from_endpoints(
+        self, endpoints: list[str], url: str, required_key: str
+    ) -> tuple[any, dict[str, str]]:
+        ordered_endpoints = bots.api.datanode.selector.order(endpoints)
+        route = _route(url)
+
+        hedger = bots.api.datanode.hedger
+        if not hedger is None and len(ordered_endpoints) > 1:
+            delay = hedger.delay(
+                bots.api.datanode.selector.latency_percentile(ordered_endpoints[0], hedger.percentile, route)
+            )
+            if not delay is None:
+                response = await self._hedged_call(
+                    ordered_endpoints[0], ordered_endpoints[1], url, required_key, route, delay
+                )
+                if not response is None:
+                    return response
+
+                bots.api.metrics.fallbacks.inc(route=route)
+                ordered_endpoints = ordered_endpoints[2:]
+
+        for idx, endpoint in enumerate(ordered_endpoints):
+            if idx > 0:
+                bots.api.metrics.fallbacks.inc(route=route)
+
+            response = await self._call_endpoint(endpoint, url, required_key, route)
+            if not response is None:
+                return response
+
+        raise requests.RequestException(f"all endpoints for /{url} did not return a valid response")
+
+    async def paginate(
+        self,
+        endpoints: list[str],
+        path: str,
+        connection: str,
+        query: Optional[list[str]] = None,
+        page_size: Optional[int] = None,
+        after_cursor: Optional[str] = None,
+    ) -> AsyncIterator[dict[str, any]]:
+        """
+        Async version of bots.api.datanode.paginate, the next page is always prefetched.
+        """
+
+        pages = 0
+
+        async def fetch(cursor: Optional[str]) -> dict[str, any]:
+            nonlocal pages
+            url = _page_url(path, query, page_size, cursor)
+            page = (await self._get_from_endpoints(endpoints, url, connection))[0][connection]
+            pages += 1
+            return page
+
+        next_page = None
+        try:
+            page = await fetch(after_cursor)
+            while True:
+                next_cursor = _next_cursor(page)
+                next_page = None if next_cursor is None else asyncio.create_task(fetch(next_cursor))
+
+                for edge in page.get("edges", []):
+                    if not "node" in edge:
+                        continue
+                    yield edge["node"]
+
+                if next_page is None:
+                    return
+
+                page = await next_page
+        finally:
+            if not next_page is None and not next_page.done():
+                next_page.cancel()
+
+            if pages > 0:
+                bots.api.metrics.pagination_pages.observe(pages, route=path)
+
+    async def get_statistics(self, endpoints: list[str]) -> dict[str, any]:
+        response = await self._get_from_endpoints(endpoints, "statistics", "statistics")
+
+        result = response[0]["statistics"]
+        # append data-node height to the response
+        if len(response) > 1 and "x-block-height" in response[1]:
+            result["x-block-height"] = response[1]["x-block-height"]
+
+        return result
+
+    async def get_markets(self, endpoints: list[str], exclude_statuses: list[str] = []) -> list[dict[str, any]]:
+        # catalogs are served from the shared catalog cache of the blocking API
+        return await asyncio.to_thread(bots.api.datanode.get_markets, endpoints, exclude_statuses)
+
+    async def get_assets(self, endpoints: list[str]) -> list[dict[str, any]]:
+        return await asyncio.to_thread(bots.api.datanode.get_assets, endpoints)
+
+    async def iter_accounts(
+        self,
+        endpoints: list[str],
+        asset_id: Optional[str] = None,
+        parties: Optional[list[str]] = None,
+        market_ids: Optional[list[str]] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[bots.api.types.Account]:
+        query = _accounts_query(asset_id, parties, market_ids)
+
+        async for node in self.paginate(endpoints, "api/v2/accounts", "accounts", query, page_size):
+            yield _account_from_node(node)
+
+    async def get_accounts(
+        self,
+        endpoints: list[str],
+        asset_id: Optional[str] = None,
+        parties: Optional[list[str]] = None,
+        market_ids: Optional[list[str]] = None,
+        page_size: Optional[int] = None,
+    ) -> list[bots.api.types.Account]:
+        if not bots.api.datanode.grpc_client is None:
+            return await asyncio.to_thread(
+                bots.api.datanode.get_accounts, endpoints, asset_id, parties, market_ids, None, page_size
+            )
+
+        return [account async for account in self.iter_accounts(endpoints, asset_id, parties, market_ids, page_size)]
+
+    async def get_parties_accounts(
+        self,
+        endpoints: list[str],
+        parties: list[str],
+        asset_ids: Optional[list[str]] = None,
+        market_ids: Optional[list[str]] = None,
+        chunk_size: int = DEFAULT_PARTIES_CHUNK_SIZE,
+        page_size: Optional[int] = None,
+    ) -> list[bots.api.types.Account]:
+        """
+        Returns accounts owned by the given parties. Parties are queried in chunks to keep the URL length
+        within limits and all chunks are queried concurrently. When more than one asset is requested,
+        accounts for all assets are fetched in one pass and filtered locally.
+        """
+        asset_id = asset_ids[0] if not asset_ids is None and len(asset_ids) == 1 else None
+
+        chunks_accounts = await asyncio.gather(
+            *[
+                self.get_accounts(endpoints, asset_id, parties_chunk, market_ids, page_size)
+                for parties_chunk in _parties_chunks(parties, chunk_size)
+            ]
+        )
+
+        return [
+            account
+            for accounts in chunks_accounts
+            for account in accounts
+            if asset_ids is None or account.asset in asset_ids
+        ]
+
+    async def probe_endpoints(
+        self, endpoints: list[str], timeout: float = DEFAULT_PROBE_TIMEOUT
+    ) -> list[bots.api.types.EndpointHealth]:
+        if len(endpoints) < 1:
+            return []
+
+        # probes run in their own executor, the default one is joined on the event loop shutdown,
+        # which would wait for blackholed hosts until the request timeout
+        executor = ThreadPoolExecutor(max_workers=len(endpoints), thread_name_prefix="endpoint-probe")
+        loop = asyncio.get_running_loop()
+
+        async def probe(endpoint: str) -> Optional[bots.api.types.EndpointHealth]:
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(executor, _probe_endpoint, endpoint, timeout), timeout
+                )
+            except asyncio.TimeoutError:
+                return None
+
+        try:
+            probes = await asyncio.gather(*[probe(endpoint) for endpoint in endpoints])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return [probe for probe in probes if not probe is None]
+
+    async def get_healthy_endpoints(
+        self,
+        endpoints: list[str],
+        max_allowed_lag_blocks: int = DEFAULT_MAX_ALLOWED_LAG_BLOCKS,
+        timeout: float = DEFAULT_PROBE_TIMEOUT,
+    ) -> list[str]:
+        probes = await self.probe_endpoints(endpoints, timeout)
+
+        return [probe.endpoint for probe in rank_endpoints(probes, max_allowed_lag_blocks)]
+
+
+def run(func: Callable[[AsyncDataNodeClient], Awaitable[T]]) -> T:
+    """
+    Run the coroutine created by func with a fresh client in a new event loop.
+    Cannot be called from a thread which already runs an event loop.
+    """
+
+    async def main() -> T:
+        return await func(AsyncDataNodeClient(_max_concurrency_per_host))
+
+    return asyncio.run(main())
+
+
+def get_statistics(endpoints: list[str]) -> dict[str, any]:
+    return run(lambda client: client.get_statistics(endpoints))
+
+
+def get_markets(endpoints: list[str], exclude_statuses: list[str] = []) -> list[dict[str, any]]:
+    return run(lambda client: client.get_markets(endpoints, exclude_statuses))
+
+
+def get_assets(endpoints: list[str]) -> list[dict[str, any]]:
+    return run(lambda client: client.get_assets(endpoints))
+
+
+def get_accounts(
+    endpoints: list[str],
+    asset_id: Optional[str] = None,
+    parties: Optional[list[str]] = None,
+    market_ids: Optional[list[str]] = None,
+    page_size: Optional[int] = None,
+) -> list[bots.api.types.Account]:
+    return run(lambda client: client.get_accounts(endpoints, asset_id, parties, market_ids, page_size))
+
+
+def get_parties_accounts(
+    endpoints: list[str],
+    parties: list[str],
+    asset_ids: Optional[list[str]] = None,
+    market_ids: Optional[list[str]] = None,
+    chunk_size: int = DEFAULT_PARTIES_CHUNK_SIZE,
+    page_size: Optional[int] = None,
+) -> list[bots.api.types.Account]:
+    return run(
+        lambda client: client.get_parties_accounts(endpoints, parties, asset_ids, market_ids, chunk_size, page_size)
+    )
+
+
+def get_healthy_endpoints(
+    endpoints: list[str],
+    max_allowed_lag_blocks: int = DEFAULT_MAX_ALLOWED_LAG_BLOCKS,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+) -> list[str]:
+    return run(lambda client: client.get_healthy_endpoints(endpoints, max_allowed_lag_blocks, timeout))
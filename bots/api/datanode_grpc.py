@@ -0,0 +1,144 @@
+import time
+import itertools
+import threading
+import grpc
+import requests
+import bots.api.metrics
+import bots.api.types
+
+from typing import Iterator, Optional
+from google.protobuf.json_format import MessageToDict
+from vega_sim.proto.data_node.api.v2 import trading_data_pb2, trading_data_pb2_grpc
+from bots.api.datanode import _account_from_node, iterate_pages
+from bots.api.selector import EndpointSelector
+
+# markets with full instrument metadata easily exceed the default 4MB
+MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+
+
+class GrpcDataNodeClient:
+    """
+    Data-node client talking to the TradingDataService over gRPC.
+
+    Every host has a small pool of long living channels, calls are spread over them
+    round-robin. Hosts are ordered by the endpoint selector, like the REST hosts.
+    Nodes are returned as dicts in the same format as the REST API returns them.
+    """
+
+    def __init__(
+        self,
+        hosts: list[str],
+        channels_per_host: int = 2,
+        timeout: float = 30.0,
+        selector: Optional[EndpointSelector] = None,
+    ):
+        self._hosts = hosts
+        self._timeout = timeout
+        self._selector = EndpointSelector() if selector is None else selector
+        self._stubs = {
+            host: [
+                trading_data_pb2_grpc.TradingDataServiceStub(
+                    grpc.insecure_channel(
+                        host,
+                        options=[
+                            ("grpc.max_receive_message_length", MAX_MESSAGE_LENGTH),
+                            ("grpc.keepalive_time_ms", 30000),
+                        ],
+                    )
+                )
+                for _ in range(channels_per_host)
+            ]
+            for host in hosts
+        }
+        self._counters = {host: itertools.count() for host in hosts}
+        self._lock = threading.Lock()
+
+    def _stub(self, host: str) -> trading_data_pb2_grpc.TradingDataServiceStub:
+        with self._lock:
+            idx = next(self._counters[host])
+
+        return self._stubs[host][idx % len(self._stubs[host])]
+
+    def _call(self, method: str, request: any) -> any:
+        for idx, host in enumerate(self._selector.order(self._hosts)):
+            if idx > 0:
+                bots.api.metrics.fallbacks.inc(route=method)
+
+            started = time.monotonic()
+            try:
+                response = getattr(self._stub(host), method)(request, timeout=self._timeout)
+            except grpc.RpcError:
+                bots.api.metrics.request_errors.inc(endpoint=host, route=method)
+                self._selector.record_failure(host)
+                continue
+            finally:
+                bots.api.metrics.request_duration.observe(time.monotonic() - started, endpoint=host, route=method)
+
+            bots.api.metrics.response_bytes.inc(response.ByteSize(), endpoint=host, route=method)
+            self._selector.record_success(host, time.monotonic() - started, method)
+            return response
+
+        raise requests.RequestException(f"all gRPC endpoints for {method} did not return a valid response")
+
+    def paginate(
+        self,
+        method: str,
+        request: any,
+        connection: str,
+        page_size: Optional[int] = None,
+        after_cursor: Optional[str] = None,
+    ) -> Iterator[dict[str, any]]:
+        def fetch(cursor: Optional[str]) -> dict[str, any]:
+            page_request = type(request)()
+            page_request.CopyFrom(request)
+            page_request.pagination.CopyFrom(trading_data_pb2.Pagination(first=page_size, after=cursor))
+
+            response = self._call(method, page_request)
+            return MessageToDict(getattr(response, connection), including_default_value_fields=True)
+
+        return iterate_pages(fetch, after_cursor, route=method)
+
+    def get_markets(self) -> Iterator[dict[str, any]]:
+        return self.paginate("ListMarkets", trading_data_pb2.ListMarketsRequest(), "markets")
+
+    def get_assets(self) -> Iterator[dict[str, any]]:
+        return self.paginate("ListAssets", trading_data_pb2.ListAssetsRequest(), "assets")
+
+    def iter_accounts(
+        self,
+        asset_id: Optional[str] = None,
+        parties: Optional[list[str]] = None,
+        market_ids: Optional[list[str]] = None,
+        after_cursor: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[bots.api.types.Account]:
+        request = trading_data_pb2.ListAccountsRequest(
+            filter=trading_data_pb2.AccountFilter(
+                asset_id=asset_id,
+                party_ids=parties,
+                market_ids=market_ids,
+            )
+        )
+
+        for node in self.paginate("ListAccounts", request, "accounts", page_size, after_cursor):
+            yield _account_from_node(node)
+
+    def observe_accounts(self, party_id: str) -> Iterator[dict[str, any]]:
+        """
+        Stream ObserveAccounts messages of the party from the best host, in the REST JSON format.
+        """
+        host = self._selector.order(self._hosts)[0]
+        request = trading_data_pb2.ObserveAccountsRequest(party_id=party_id)
+
+        started = time.monotonic()
+        connected = False
+        try:
+            for response in self._stub(host).ObserveAccounts(request):
+                if not connected:
+                    self._selector.record_success(host, time.monotonic() - started, "ObserveAccounts")
+                    connected = True
+
+                yield MessageToDict(response, including_default_value_fields=True)
+        except grpc.RpcError:
+            self._selector.record_failure(host)
+            raise
@@ -0,0 +1,83 @@
+import logging
+import bots.api.metrics
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Sends the same idempotent request to a second endpoint when the first one does
+    not answer within the expected latency. The first valid response wins, the
+    other request is cancelled if it has not started yet, or its result is dropped.
+    """
+
+    logger = logging.getLogger("hedger")
+
+    def __init__(self, percentile: float = 0.95, min_delay: float = 0.05, max_workers: int = 16):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-request")
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return self._executor
+
+    def delay(self, expected_latency: Optional[float]) -> Optional[float]:
+        """
+        Seconds to wait for the primary endpoint before hedging. None means the request
+        is not hedged, because without the latency history a slow endpoint cannot be told apart.
+        """
+        return None if expected_latency is None else max(self.min_delay, expected_latency)
+
+    def record_sent(self):
+        bots.api.metrics.hedges_sent.inc()
+
+    def record_won(self):
+        bots.api.metrics.hedges_won.inc()
+
+    def call(
+        self,
+        primary: str,
+        secondary: str,
+        call: Callable[[str], Optional[T]],
+        expected_latency: Optional[float],
+    ) -> Optional[T]:
+        """
+        Returns the first valid(not None) result of call for the primary or secondary
+        endpoint. Returns None, when both of them fail.
+        """
+        delay = self.delay(expected_latency)
+        if delay is None:
+            result = call(primary)
+            return result if not result is None else call(secondary)
+
+        primary_future = self._executor.submit(call, primary)
+        done, _ = wait([primary_future], timeout=delay)
+        if primary_future in done:
+            result = primary_future.result()
+            return result if not result is None else call(secondary)
+
+        Hedger.logger.debug(f"No response from {primary} after {delay:.3f}s, hedging to {secondary}")
+        self.record_sent()
+
+        secondary_future = self._executor.submit(call, secondary)
+        pending = {primary_future, secondary_future}
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+
+                if future is secondary_future:
+                    self.record_won()
+
+                for loser in pending:
+                    loser.cancel()
+
+                return result
+
+        return None
@@ -1,12 +1,128 @@
+import json
+import time
+import threading
 import requests
 import logging
+import urllib.parse
+import bots.api.metrics
+import bots.config.types
 
+from typing import Iterator, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_call(endpoint: str) -> tuple[any, dict[str, str]]:
-    endpoint_url = endpoint if "http" in endpoint else f"https://{endpoint}"
 
-    logging.debug(f"Making GET call to {endpoint_url}")
-    resp = requests.get(endpoint_url)
+class HttpClient:
+    """
+    Keep-alive HTTP client shared by all data-node calls.
+
+    The connection pools live in a single adapter, which is thread-safe. Each
+    thread gets its own requests.Session mounted on that adapter, because
+    sessions are not guaranteed to be thread-safe.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 30.0,
+        retries: int = 2,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                # a data-node which stalls after accepting the connection is not retried, the caller moves
+                # on to the next endpoint instead of waiting for the read timeout again
+                read=0,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=["GET"],
+                # return the last response, status code is checked by the caller
+                raise_on_status=False,
+            ),
+        )
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+
+        return session
+
+    def get(
+        self, url: str, timeout: Optional[float] = None, headers: Optional[dict[str, str]] = None
+    ) -> requests.Response:
+        return self._session().get(url, timeout=self.timeout if timeout is None else timeout, headers=headers)
+
+    def stream(self, url: str, timeout: Optional[float] = None) -> requests.Response:
+        return self._session().get(url, timeout=self.timeout if timeout is None else timeout, stream=True)
+
+    def close(self):
+        self._adapter.close()
+
+
+_client = HttpClient()
+
+
+def configure(config: bots.config.types.DataNodeConfig):
+    global _client
+
+    previous_client = _client
+    _client = HttpClient(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        connect_timeout=config.connect_timeout,
+        read_timeout=config.read_timeout,
+        retries=config.retries,
+    )
+    previous_client.close()
+
+
+def _endpoint_url(endpoint: str) -> str:
+    return endpoint if "http" in endpoint else f"https://{endpoint}"
+
+
+def metric_labels(endpoint: str) -> dict[str, str]:
+    """
+    Labels of the request metrics for the endpoint url, e.g: api.n00.vega.xyz/api/v2/markets?x=y
+    is labelled with the endpoint api.n00.vega.xyz and the route api/v2/markets.
+    """
+    url = urllib.parse.urlsplit(_endpoint_url(endpoint))
+
+    return {"endpoint": url.netloc, "route": url.path.strip("/")}
+
+
+def _get(endpoint_url: str, timeout: Optional[float], headers: Optional[dict[str, str]] = None) -> requests.Response:
+    """
+    GET call recording the request duration, response size and errors.
+    """
+    labels = metric_labels(endpoint_url)
+    started = time.monotonic()
+    try:
+        resp = _client.get(endpoint_url, timeout=timeout, headers=headers)
+    except Exception:
+        bots.api.metrics.request_errors.inc(**labels)
+        raise
+    finally:
+        bots.api.metrics.request_duration.observe(time.monotonic() - started, **labels)
+
+    bots.api.metrics.response_bytes.inc(len(resp.content), **labels)
+    if resp.status_code != 200 and resp.status_code != 304:
+        bots.api.metrics.request_errors.inc(**labels)
+
+    return resp
+
+
+def _response_json(endpoint_url: str, resp: requests.Response) -> tuple[any, dict[str, str]]:
     if resp.status_code != 200:
         logging.debug(f"Invalid response from {endpoint_url}. Expected status code 200, got {resp.status_code}")
         raise requests.HTTPError(f"Invalid response code. Expected 200, got {resp.status_code}")
@@ -18,3 +134,61 @@ def get_call(endpoint: str) -> tuple[any, dict[str, str]]:
         logging.debug(f"Failed to get response from {endpoint_url}: {err}")
         raise e
     return (resp.json(), resp.headers)
+
+
+def get_call(endpoint: str, timeout: Optional[float] = None) -> tuple[any, dict[str, str]]:
+    endpoint_url = _endpoint_url(endpoint)
+
+    logging.debug(f"Making GET call to {endpoint_url}")
+    resp = _get(endpoint_url, timeout)
+
+    return _response_json(endpoint_url, resp)
+
+
+def conditional_get_call(
+    endpoint: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> tuple[Optional[any], dict[str, str]]:
+    """
+    GET call with the If-None-Match/If-Modified-Since headers. When the server
+    responds with 304 Not Modified, the returned json is None.
+    """
+    endpoint_url = _endpoint_url(endpoint)
+    headers = {}
+    if not etag is None:
+        headers["If-None-Match"] = etag
+    if not last_modified is None:
+        headers["If-Modified-Since"] = last_modified
+
+    logging.debug(f"Making conditional GET call to {endpoint_url}")
+    resp = _get(endpoint_url, timeout, headers)
+    if resp.status_code == 304:
+        return (None, resp.headers)
+
+    return _response_json(endpoint_url, resp)
+
+
+def stream_call(endpoint: str, timeout: Optional[float] = None) -> Iterator[any]:
+    """
+    Call the streaming endpoint, e.g: /api/v2/stream/accounts, and yield every
+    message of the newline delimited JSON response.
+    """
+    endpoint_url = _endpoint_url(endpoint)
+
+    logging.debug(f"Opening stream to {endpoint_url}")
+    with _client.stream(endpoint_url, timeout=timeout) as resp:
+        if resp.status_code != 200:
+            logging.debug(f"Invalid response from {endpoint_url}. Expected status code 200, got {resp.status_code}")
+            raise requests.HTTPError(f"Invalid response code. Expected 200, got {resp.status_code}")
+
+        for line in resp.iter_lines():
+            if len(line) < 1:
+                continue
+
+            message = json.loads(line)
+            if "error" in message:
+                raise requests.RequestException(f"Stream {endpoint_url} failed: {message['error']}")
+
+            yield message.get("result", message)
@@ -0,0 +1,232 @@
+import math
+import threading
+
+from typing import Callable, Iterable, Optional
+
+# seconds, covers fast cached responses up to the slow full downloads
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_PAGES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if len(names) < 1:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    Base of the metrics rendered in the Prometheus text exposition format.
+    Label values are passed as keyword arguments, all label names are required.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels.keys()) != set(self.labels):
+            raise ValueError(f"Metric {self.name} expects labels {self.labels}, got {tuple(labels.keys())}")
+
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> list[str]:
+        return []
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    Gauge set explicitly, or read from the function on every render, when the value
+    changes continuously(e.g: age of something). Only unlabelled gauges use functions.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]):
+        with self._lock:
+            self._function = function
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            function = self._function
+            values = sorted(self._values.items())
+
+        if not function is None:
+            return [f"{self.name} {_format_value(function())}"]
+
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # per labels: (counts per bucket, sum, count)
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+                    break
+
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+
+            self._metrics[metric.name] = metric
+
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        with self._lock:
+            return self._metrics.get(name, None)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(
+    Histogram(
+        "datanode_request_duration_seconds",
+        "Duration of data-node requests, including failed ones.",
+        ["endpoint", "route"],
+    )
+)
+response_bytes = registry.register(
+    Counter(
+        "datanode_response_bytes_total",
+        "Size of data-node response bodies.",
+        ["endpoint", "route"],
+    )
+)
+request_errors = registry.register(
+    Counter(
+        "datanode_request_errors_total",
+        "Data-node requests which failed or returned an invalid response.",
+        ["endpoint", "route"],
+    )
+)
+fallbacks = registry.register(
+    Counter(
+        "datanode_fallbacks_total",
+        "Requests retried on the next endpoint, because the previous one failed.",
+        ["route"],
+    )
+)
+pagination_pages = registry.register(
+    Histogram(
+        "datanode_pagination_pages",
+        "Number of pages downloaded by a single pagination.",
+        ["route"],
+        DEFAULT_PAGES_BUCKETS,
+    )
+)
+hedges_sent = registry.register(
+    Counter("datanode_hedged_requests_total", "Requests sent to the second endpoint, because the first one was slow.")
+)
+hedges_won = registry.register(
+    Counter("datanode_hedged_requests_won_total", "Hedged requests answered first by the second endpoint.")
+)
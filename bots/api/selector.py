@@ -0,0 +1,141 @@
+import time
+import logging
+import threading
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+
+@dataclass
+class EndpointStats:
+    # exponentially weighted moving average of the call duration in seconds
+    latency: Optional[float] = None
+    # exponentially weighted moving average of failures, 0 - no errors, 1 - all calls fail
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    # monotonic time when the circuit has been opened, None when the circuit is closed
+    opened_at: Optional[float] = None
+    # True when a call to the half-open endpoint is in progress
+    trial_in_progress: bool = False
+
+
+class EndpointSelector:
+    """
+    Orders endpoints from the fastest healthy one, based on the latency and errors
+    recorded for previous calls.
+
+    An endpoint which fails failure_threshold times in a row has its circuit opened
+    and is used only as the last resort. After the cooldown, the circuit is half-open:
+    the endpoint is put first for a single trial call, a success closes the circuit,
+    while a failure opens it for another cooldown.
+    """
+
+    logger = logging.getLogger("endpoint-selector")
+    # number of recent latencies kept per endpoint and route for percentiles
+    samples_count = 100
+    # percentiles are not reported for routes with less samples
+    min_samples_count = 10
+
+    def __init__(self, alpha: float = 0.3, failure_threshold: int = 3, cooldown: float = 30.0):
+        self._alpha = alpha
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._stats: dict[str, EndpointStats] = {}
+        # per (endpoint, route), routes differ a lot in latency, e.g: health probes and account pages
+        self._samples: dict[tuple[str, Optional[str]], deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _circuit_state(self, stats: Optional[EndpointStats], now: float) -> str:
+        if stats is None or stats.opened_at is None:
+            return CIRCUIT_CLOSED
+
+        if now - stats.opened_at >= self._cooldown:
+            return CIRCUIT_HALF_OPEN
+
+        return CIRCUIT_OPEN
+
+    def _score(self, stats: Optional[EndpointStats]) -> float:
+        # endpoints without measurements are tried first so they get measured
+        if stats is None or stats.latency is None:
+            return 0.0
+
+        return stats.latency * (1.0 + 10.0 * stats.error_rate)
+
+    def order(self, endpoints: list[str]) -> list[str]:
+        now = time.monotonic()
+        trials, closed, half_open, opened = [], [], [], []
+
+        with self._lock:
+            for endpoint in endpoints:
+                stats = self._stats.get(endpoint, None)
+                state = self._circuit_state(stats, now)
+                if state == CIRCUIT_CLOSED:
+                    closed.append((self._score(stats), endpoint))
+                elif state == CIRCUIT_HALF_OPEN and not stats.trial_in_progress:
+                    stats.trial_in_progress = True
+                    trials.append((0.0, endpoint))
+                elif state == CIRCUIT_HALF_OPEN:
+                    half_open.append((self._score(stats), endpoint))
+                else:
+                    opened.append((stats.opened_at, endpoint))
+
+        # sorted is stable, endpoints with equal scores keep the given order
+        return [
+            endpoint
+            for group in [trials, closed, half_open, opened]
+            for _, endpoint in sorted(group, key=lambda item: item[0])
+        ]
+
+    def record_success(self, endpoint: str, latency: float, route: Optional[str] = None):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats())
+            stats.latency = latency if stats.latency is None else self._ewma(stats.latency, latency)
+            self._samples.setdefault((endpoint, route), deque(maxlen=EndpointSelector.samples_count)).append(latency)
+            stats.error_rate = self._ewma(stats.error_rate, 0.0)
+            stats.consecutive_failures = 0
+            stats.trial_in_progress = False
+            if not stats.opened_at is None:
+                EndpointSelector.logger.info(f"Closing circuit for {endpoint}")
+                stats.opened_at = None
+
+    def record_failure(self, endpoint: str):
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats())
+            stats.error_rate = self._ewma(stats.error_rate, 1.0)
+            stats.consecutive_failures += 1
+            stats.trial_in_progress = False
+
+            state = self._circuit_state(stats, now)
+            if state == CIRCUIT_HALF_OPEN or (
+                state == CIRCUIT_CLOSED and stats.consecutive_failures >= self._failure_threshold
+            ):
+                EndpointSelector.logger.info(
+                    f"Opening circuit for {endpoint} after {stats.consecutive_failures} consecutive failures"
+                )
+                stats.opened_at = now
+
+    def latency_percentile(self, endpoint: str, percentile: float, route: Optional[str] = None) -> Optional[float]:
+        """
+        Returns the given percentile(0-1) of recent successful call durations of the route,
+        or None when there is not enough samples for the endpoint and route.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get((endpoint, route), []))
+
+        if len(samples) < EndpointSelector.min_samples_count:
+            return None
+
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+    def stats(self) -> dict[str, EndpointStats]:
+        with self._lock:
+            return {endpoint: EndpointStats(**vars(stats)) for endpoint, stats in self._stats.items()}
+
+    def _ewma(self, current: float, value: float) -> float:
+        return (1.0 - self._alpha) * current + self._alpha * value
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -8,3 +9,29 @@ class Account:
     asset: str
     market_id: str
     type: str
+
+
+@dataclass
+class EndpointHealth:
+    endpoint: str
+    core_height: int
+    # block height reported by the data-node in the x-block-height header
+    data_node_height: Optional[int]
+    # duration of the /statistics call in seconds
+    latency: float
+
+    @property
+    def height(self) -> int:
+        if self.data_node_height is None:
+            return self.core_height
+
+        return min(self.core_height, self.data_node_height)
+
+
+@dataclass
+class AccountsUpdate:
+    accounts: list[Account]
+    # True for pages of the initial snapshot, False for live updates
+    snapshot: bool
+    # True for the last page of the initial snapshot
+    last_page: bool
@@ -105,6 +105,82 @@ class HttpServerConfig:
     port: int
 
 
+@dataclass
+class DataNodeConfig:
+    # Number of per-host connection pools kept by the HTTP client
+    pool_connections: int
+    # Maximum number of connections kept open per host
+    pool_maxsize: int
+    # Seconds to wait for the TCP/TLS connection to a data-node
+    connect_timeout: float
+    # Seconds to wait for the data-node response
+    read_timeout: float
+    # Number of retries for failed connections and 502/503/504 responses, read timeouts are not retried
+    retries: int
+    # Number of accounts requested per page(pagination.first), 0 uses the default page size of the data-node
+    accounts_page_size: int
+    # Deadline in seconds for the /statistics health probe of a single data-node
+    probe_timeout: float
+    # Data-nodes lagging more blocks than this behind the network are considered unhealthy
+    max_allowed_lag_blocks: int
+    # Weight of the latest call in the moving average of the data-node latency, between 0 and 1
+    latency_ewma_alpha: float
+    # Number of consecutive failures after which the data-node is not used until the cooldown passes
+    circuit_failure_threshold: int
+    # Seconds after which the failing data-node is tried again
+    circuit_cooldown: float
+    # Seconds between the background health probes of all data-nodes
+    health_check_interval: float
+    # Maximum number of concurrent requests sent to a single data-node by the asyncio client
+    max_concurrency_per_host: int
+    # Seconds for which the downloaded markets are used before they are revalidated
+    markets_cache_ttl: float
+    # Seconds for which the downloaded assets are used before they are revalidated
+    assets_cache_ttl: float
+    # When true, the markets and assets catalogs are stored in the work_dir and reused after restart
+    catalog_snapshot: bool
+    # Seconds between checks for new, changed and closed markets and assets
+    catalog_refresh_interval: float
+    # API used to fetch markets, assets and accounts: rest, or grpc(uses API.GRPC hosts from the network config)
+    backend: str
+    # Number of gRPC channels kept open per data-node
+    grpc_channels_per_host: int
+    # When true, balances of bot parties are kept in memory from the data-node account updates streams, one per party
+    accounts_stream: bool
+    # Seconds without any message after which the accounts stream is reopened
+    accounts_stream_read_timeout: float
+    # Seconds to wait before the closed accounts stream is reopened
+    accounts_stream_reconnect_delay: float
+    # Seconds between checks for new parties to stream
+    accounts_stream_subscription_interval: float
+    # When true, a request not answered within the usual latency of the data-node is also sent to the next one
+    hedging: bool
+    # Percentile(0-1) of recent latencies of the data-node after which the request is hedged
+    hedge_latency_percentile: float
+    # Minimum seconds to wait before the request is hedged
+    hedge_min_delay: float
+
+
+@dataclass
+class TradersCacheConfig:
+    # When true, the /traders response is rebuilt in the background and requests never wait for the rebuild
+    background_refresh: bool
+    # Seconds between background rebuilds of the response
+    refresh_interval: float
+    # Maximum age in seconds of the response served while the rebuild fails or runs late
+    max_staleness: float
+    # Number of versions of the response kept for /traders/changes, older versions get the full snapshot
+    history_size: int
+    # When true, changes are also streamed as Server-Sent Events from /traders/changes/stream
+    changes_stream: bool
+    # Seconds between keep-alive comments sent on idle streams
+    changes_stream_heartbeat: float
+    # Number of threads building scenarios of the response concurrently, 1 builds them one by one
+    build_workers: int
+    # /traders/topups returns parties whose balance is below this fraction(0-1) of their initial_mint
+    topup_fraction: float
+
+
 @dataclass
 class ScenarioMarketManagerConfig:
     asset_name: str
@@ -216,6 +292,10 @@ class BotsConfig:
     wallet: WalletConfig
     # http server config
     http_server: HttpServerConfig
+    # data-node client config
+    datanode: DataNodeConfig
+    # /traders response cache config
+    traders_cache: TradersCacheConfig
     # scenarios config
     scenarios: ScenariosConfigType
 
@@ -366,6 +446,54 @@ def http_server_config_from_json(json: dict[str, any]) -> HttpServerConfig:
     )
 
 
+def traders_cache_config_from_json(json: dict[str, any]) -> TradersCacheConfig:
+    history_size = int(json.get("history_size", 100))
+    if history_size < 1:
+        raise Exception("The /traders history size must be positive")
+
+    return TradersCacheConfig(
+        background_refresh=bool(json.get("background_refresh", False)),
+        refresh_interval=float(json.get("refresh_interval", 45.0)),
+        max_staleness=float(json.get("max_staleness", 300.0)),
+        history_size=history_size,
+        changes_stream=bool(json.get("changes_stream", False)),
+        changes_stream_heartbeat=float(json.get("changes_stream_heartbeat", 15.0)),
+        build_workers=int(json.get("build_workers", 4)),
+        topup_fraction=float(json.get("topup_fraction", 0.5)),
+    )
+
+
+def datanode_config_from_json(json: dict[str, any]) -> DataNodeConfig:
+    return DataNodeConfig(
+        pool_connections=int(json.get("pool_connections", 10)),
+        pool_maxsize=int(json.get("pool_maxsize", 10)),
+        connect_timeout=float(json.get("connect_timeout", 3.0)),
+        read_timeout=float(json.get("read_timeout", 30.0)),
+        retries=int(json.get("retries", 2)),
+        accounts_page_size=int(json.get("accounts_page_size", 0)),
+        probe_timeout=float(json.get("probe_timeout", 5.0)),
+        max_allowed_lag_blocks=int(json.get("max_allowed_lag_blocks", 500)),
+        latency_ewma_alpha=float(json.get("latency_ewma_alpha", 0.3)),
+        circuit_failure_threshold=int(json.get("circuit_failure_threshold", 3)),
+        circuit_cooldown=float(json.get("circuit_cooldown", 30.0)),
+        health_check_interval=float(json.get("health_check_interval", 30.0)),
+        max_concurrency_per_host=int(json.get("max_concurrency_per_host", 4)),
+        markets_cache_ttl=float(json.get("markets_cache_ttl", 60.0)),
+        assets_cache_ttl=float(json.get("assets_cache_ttl", 300.0)),
+        catalog_snapshot=bool(json.get("catalog_snapshot", True)),
+        catalog_refresh_interval=float(json.get("catalog_refresh_interval", 60.0)),
+        backend=json.get("backend", "rest"),
+        grpc_channels_per_host=int(json.get("grpc_channels_per_host", 2)),
+        accounts_stream=bool(json.get("accounts_stream", False)),
+        accounts_stream_read_timeout=float(json.get("accounts_stream_read_timeout", 300.0)),
+        accounts_stream_reconnect_delay=float(json.get("accounts_stream_reconnect_delay", 5.0)),
+        accounts_stream_subscription_interval=float(json.get("accounts_stream_subscription_interval", 60.0)),
+        hedging=bool(json.get("hedging", False)),
+        hedge_latency_percentile=float(json.get("hedge_latency_percentile", 0.95)),
+        hedge_min_delay=float(json.get("hedge_min_delay", 0.05)),
+    )
+
+
 def config_from_json(json: dict[str, any]) -> BotsConfig:
     work_dir = json.get("work_dir", "./network")
     if not os.path.isabs(work_dir):
@@ -381,6 +509,8 @@ def config_from_json(json: dict[str, any]) -> BotsConfig:
         work_dir=work_dir,
         wallet=wallet_config,
         http_server=http_server_config_from_json(json.get("http_server", dict())),
+        datanode=datanode_config_from_json(json.get("datanode", dict())),
+        traders_cache=traders_cache_config_from_json(json.get("traders_cache", dict())),
         scenarios={
             scenario_name: scenario_config_from_json(raw_scenarios_config[scenario_name])
             for scenario_name in raw_scenarios_config
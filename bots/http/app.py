@@ -29,7 +29,8 @@ def health_check():
 
 
 def handler(path: str, handler_func: Callable):
-    app.add_url_rule(view_func=handler_func, rule=path)
+    # handlers are usually lambdas, the path keeps endpoint names unique
+    app.add_url_rule(view_func=handler_func, rule=path, endpoint=path)
 
 
 def run(debug: bool, http_config: bots.config.types.HttpServerConfig):
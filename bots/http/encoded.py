@@ -0,0 +1,195 @@
+import json
+import zlib
+import flask
+import hashlib
+import threading
+
+from typing import Callable, Hashable, Iterable, Iterator, Optional, TypeVar
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional, without it responses are compressed only with gzip
+    brotli = None
+
+
+T = TypeVar("T")
+
+# preferred first, when the client accepts more of them with the same quality
+ENCODINGS = ["br", "gzip", "identity"]
+
+
+def _gzip(chunks: Iterable[bytes]) -> bytes:
+    # wbits=31 writes the gzip header with zero mtime, so the same body is always compressed to the same bytes
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    compressed = [compressor.compress(chunk) for chunk in chunks]
+    compressed.append(compressor.flush())
+
+    return b"".join(compressed)
+
+
+def _brotli(chunks: Iterable[bytes]) -> bytes:
+    compressor = brotli.Compressor(quality=5)
+    compressed = [compressor.process(chunk) for chunk in chunks]
+    compressed.append(compressor.finish())
+
+    return b"".join(compressed)
+
+
+class EncodedBody:
+    """
+    Encoded body kept as chunks, with its compressed variants. Gzip is compressed
+    upfront, brotli on the first request for it.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = tuple(chunks)
+        self.length = sum(len(chunk) for chunk in self.chunks)
+        self.gzip_body = _gzip(self.chunks)
+
+        digest = hashlib.sha256()
+        for chunk in self.chunks:
+            digest.update(chunk)
+        # strong validator of the body, without quotes
+        self.etag = digest.hexdigest()[:32]
+
+        self._brotli_body = None
+        self._lock = threading.Lock()
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self.chunks)
+
+    @property
+    def gzip_etag(self) -> str:
+        # every representation needs its own strong ETag
+        return self.variant_etag("gzip")
+
+    @property
+    def brotli_body(self) -> Optional[bytes]:
+        if brotli is None:
+            return None
+
+        with self._lock:
+            if self._brotli_body is None:
+                self._brotli_body = _brotli(self.chunks)
+
+            return self._brotli_body
+
+    def variant_etag(self, encoding: str) -> str:
+        return self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+
+
+def _compact(value: any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def iter_object_chunks(key: str, fragments: Iterable[dict[str, any]]) -> Iterator[bytes]:
+    """
+    Yields compact JSON of {key: {**fragments[0], **fragments[1], ...}}, one fragment per chunk,
+    so the whole document is never held in a single string. Keys of fragments must not overlap.
+    """
+    yield f"{{{_compact(key)}:{{".encode("utf-8")
+
+    separator = ""
+    for fragment in fragments:
+        if len(fragment) < 1:
+            continue
+
+        chunk = ",".join(f"{_compact(name)}:{_compact(value)}" for name, value in fragment.items())
+        yield (separator + chunk).encode("utf-8")
+        separator = ","
+
+    yield b"}}"
+
+
+def encode_json(payload: any, pretty: bool = False) -> EncodedBody:
+    if pretty:
+        return EncodedBody([json.dumps(payload, indent="    ").encode("utf-8")])
+
+    return EncodedBody([_compact(payload).encode("utf-8")])
+
+
+class EncodedJson:
+    """
+    JSON payload with its encoded bodies. The compact body is encoded upfront,
+    the pretty printed one on the first request for it.
+
+    Values derived from the payload(e.g: indexes, bodies of filtered queries) are
+    memoized with the payload, the oldest ones are dropped over max_derived.
+    """
+
+    max_derived = 64
+
+    def __init__(self, payload: any, compact_body: Optional[EncodedBody] = None):
+        self.payload = payload
+        # version of the payload, set by owners which keep the history of payloads
+        self.version = 0
+        self._bodies: dict[bool, EncodedBody] = {False: encode_json(payload) if compact_body is None else compact_body}
+        self._derived: dict[Hashable, any] = {}
+        self._lock = threading.Lock()
+
+    def body(self, pretty: bool = False) -> EncodedBody:
+        with self._lock:
+            if not pretty in self._bodies:
+                self._bodies[pretty] = encode_json(self.payload, pretty)
+
+            return self._bodies[pretty]
+
+    def derived(self, key: Hashable, factory: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+
+        # computed without the lock, concurrent callers may compute the same value twice
+        value = factory()
+        with self._lock:
+            if len(self._derived) >= EncodedJson.max_derived:
+                del self._derived[next(iter(self._derived))]
+
+            self._derived[key] = value
+
+        return value
+
+
+def pretty_requested() -> bool:
+    return flask.request.args.get("pretty", "false").lower() in ["", "1", "true", "yes"]
+
+
+def _negotiate_encoding() -> str:
+    accept_encodings = flask.request.accept_encodings
+    available = [encoding for encoding in ENCODINGS if encoding != "br" or not brotli is None]
+
+    # identity is acceptable, unless refused explicitly
+    qualities = {
+        encoding: accept_encodings.quality(encoding) if encoding != "identity" or encoding in accept_encodings else 1
+        for encoding in available
+    }
+    best = max(available, key=lambda encoding: qualities[encoding])
+
+    return best if qualities[best] > 0 else "identity"
+
+
+def encoded_response(encoded: EncodedBody, content_type: str = "application/json") -> flask.Response:
+    """
+    Response with the encoded body, compressed with the best encoding accepted by the client.
+    Requests with the If-None-Match header matching the body get 304 Not Modified without the body.
+    """
+    encoding = _negotiate_encoding()
+
+    if_none_match = flask.request.if_none_match
+    if any(if_none_match.contains_weak(encoded.variant_etag(variant)) for variant in ENCODINGS):
+        resp = flask.Response(status=304)
+    elif encoding == "identity":
+        # chunks are written one by one, without joining them into one big bytes object
+        resp = flask.Response(encoded.chunks)
+        resp.headers["Content-Length"] = str(encoded.length)
+        resp.headers["Content-Type"] = content_type
+    else:
+        resp = flask.Response(encoded.brotli_body if encoding == "br" else encoded.gzip_body)
+        resp.headers["Content-Type"] = content_type
+        resp.headers["Content-Encoding"] = encoding
+
+    resp.set_etag(encoded.variant_etag(encoding))
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
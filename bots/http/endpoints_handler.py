@@ -0,0 +1,37 @@
+import flask
+import json
+
+from bots.http.handler import Handler
+from bots.services.endpoints_monitor import EndpointsMonitor
+
+
+class Endpoints(Handler):
+    def __init__(self, monitor: EndpointsMonitor):
+        self.monitor = monitor
+
+    def serve(self):
+        snapshot = self.monitor.snapshot
+        healthy_endpoints = [probe.endpoint for probe in snapshot.ranking]
+
+        json_data = json.dumps(
+            {
+                "maxHeight": snapshot.max_height,
+                "updatedAt": snapshot.updated_at,
+                "ranking": healthy_endpoints,
+                "endpoints": [
+                    {
+                        "endpoint": probe.endpoint,
+                        "healthy": probe.endpoint in healthy_endpoints,
+                        "coreHeight": probe.core_height,
+                        "dataNodeHeight": probe.data_node_height,
+                        "lagBlocks": snapshot.max_height - probe.height,
+                        "latencyMs": round(probe.latency * 1000, 2),
+                    }
+                    for probe in snapshot.probes
+                ],
+            },
+            indent="    ",
+        )
+        resp = flask.Response(json_data)
+        resp.headers["Content-Type"] = "application/json"
+        return resp
@@ -0,0 +1,18 @@
+import flask
+import bots.api.metrics
+
+from bots.http.handler import Handler
+
+
+class Metrics(Handler):
+    """
+    Serve the data-node client metrics in the Prometheus text format.
+    """
+
+    def __init__(self, registry: bots.api.metrics.Registry = bots.api.metrics.registry):
+        self.registry = registry
+
+    def serve(self):
+        resp = flask.Response(self.registry.render())
+        resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        return resp
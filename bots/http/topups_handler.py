@@ -0,0 +1,105 @@
+import math
+import flask
+
+from typing import Optional
+from bots.http.handler import Handler
+from bots.http.encoded import encode_json, encoded_response, pretty_requested
+from bots.http.traders_handler import Traders
+
+
+def plan_topups(traders: dict[str, dict[str, any]], fraction: float) -> list[dict[str, any]]:
+    """
+    Returns parties of traders with top-up enabled, whose balance is below the fraction of their wanted
+    tokens(initial_mint), grouped by the asset and its ERC20 contract. The deficit tops the party up to
+    the wanted tokens.
+    """
+    assets = dict()
+    for trader_key, trader in traders.items():
+        if not trader["parameters"]["enableTopUp"]:
+            continue
+
+        for entry in trader["parameters"]["wantedTokens"]:
+            wanted_tokens = entry["wanted_tokens"]
+            deficit = wanted_tokens - entry["balance"]
+            if entry["balance"] >= fraction * wanted_tokens or deficit <= 0:
+                continue
+
+            asset_key = (entry["vega_asset_id"], entry["asset_erc20_address"])
+            if not asset_key in assets:
+                assets[asset_key] = {
+                    "vegaAssetId": entry["vega_asset_id"],
+                    "symbol": entry["symbol"],
+                    "erc20Address": entry["asset_erc20_address"],
+                    "totalDeficit": 0.0,
+                    "parties": dict(),
+                }
+
+            # the same party may be reported for more traders, it needs only one deposit
+            if entry["party_id"] in assets[asset_key]["parties"]:
+                continue
+
+            assets[asset_key]["totalDeficit"] += deficit
+            assets[asset_key]["parties"][entry["party_id"]] = {
+                "partyId": entry["party_id"],
+                "trader": trader_key,
+                "balance": entry["balance"],
+                "wantedTokens": wanted_tokens,
+                "deficit": deficit,
+            }
+
+    return [
+        dict(asset, parties=list(asset["parties"].values()), partiesCount=len(asset["parties"]))
+        for _, asset in sorted(assets.items())
+    ]
+
+
+def _parse_fraction(value: str) -> Optional[float]:
+    try:
+        fraction = float(value)
+    except ValueError:
+        return None
+
+    # nan and inf are parsed too, but they would make the response invalid JSON
+    if not math.isfinite(fraction) or fraction < 0 or fraction > 1:
+        return None
+
+    return fraction
+
+
+class TradersTopUps(Handler):
+    """
+    Serve the deposits needed to top up traders, so they can be sent in one batch per asset.
+    Parties below ?fraction=<0-1> of their wanted tokens are returned, the configured fraction by default.
+    """
+
+    def __init__(self, traders: Traders, fraction: float = 0.5):
+        self.traders = traders
+        self.fraction = fraction
+
+    def serve(self):
+        fraction = _parse_fraction(flask.request.args.get("fraction", default=str(self.fraction)))
+        if fraction is None:
+            return flask.Response("The fraction must be a number between 0 and 1", status=400)
+
+        pretty = pretty_requested()
+        cached_resp = self.traders.public_response()
+
+        def plan_body():
+            return encode_json(
+                {
+                    "version": cached_resp.version,
+                    "fraction": fraction,
+                    "assets": plan_topups(cached_resp.payload["traders"], fraction),
+                },
+                pretty,
+            )
+
+        # only the configured fraction is memoized, arbitrary fractions would evict other memoized bodies
+        if fraction == self.fraction:
+            body = cached_resp.derived(("topups", pretty), plan_body)
+        else:
+            body = plan_body()
+
+        resp = encoded_response(body)
+        resp.headers["X-Traders-Version"] = str(cached_resp.version)
+        return resp
@@ -0,0 +1,66 @@
+import json
+import flask
+import logging
+
+from typing import Iterator, Optional
+from bots.http.handler import Handler
+from bots.http.encoded import encode_json, encoded_response, pretty_requested
+from bots.http.traders_handler import Traders
+
+
+class TradersChanges(Handler):
+    """
+    Serve traders added, changed or removed since the version given in ?since=<version>.
+    The full snapshot is returned when the version is missing or too old.
+    Only the public report is served, recovery phrases are never part of changes.
+    """
+
+    def __init__(self, traders: Traders):
+        self.traders = traders
+
+    def serve(self):
+        changes = self.traders.changes(flask.request.args.get("since", default=None, type=int))
+
+        resp = encoded_response(encode_json(changes.as_dict(), pretty_requested()))
+        resp.headers["X-Traders-Version"] = str(changes.version)
+        return resp
+
+
+class TradersChangesStream(Handler):
+    """
+    Stream changes of traders as Server-Sent Events. The first event is the full snapshot, unless the
+    client resumes with the Last-Event-ID header or ?since=<version>. Every stream holds one http
+    server thread for its whole life.
+    """
+
+    logger = logging.getLogger("traders-changes-stream")
+
+    def __init__(self, traders: Traders, heartbeat: float = 15.0):
+        self.traders = traders
+        self.heartbeat = heartbeat
+
+    def serve(self):
+        since = flask.request.headers.get("Last-Event-ID", default=None, type=int)
+        if since is None:
+            since = flask.request.args.get("since", default=None, type=int)
+
+        resp = flask.Response(self._events(since), mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        # do not let proxies buffer events
+        resp.headers["X-Accel-Buffering"] = "no"
+        return resp
+
+    def _events(self, since: Optional[int]) -> Iterator[str]:
+        TradersChangesStream.logger.info(f"Streaming changes of traders since version {since}")
+
+        version = since
+        while True:
+            changes = self.traders.changes(version)
+            if changes.version != version:
+                version = changes.version
+                yield f"id: {version}\nevent: changes\ndata: {json.dumps(changes.as_dict(), separators=(',', ':'))}\n\n"
+                continue
+
+            # comments keep the connection open, and a closed connection fails on the write
+            yield ": heartbeat\n\n"
+            self.traders.history.wait_for_newer(version, self.heartbeat)
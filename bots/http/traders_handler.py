@@ -1,19 +1,33 @@
+import time
 import flask
 import datetime
 import logging
-import json
+import threading
 import multiprocessing
 import bots.config.types
-import bots.api.datanode
+import bots.api.metrics
 import bots.config.types
 
+from concurrent.futures import ThreadPoolExecutor
 from vega_sim.devops.wallet import ScenarioWallet
-from typing import Optional
-from bots.api.datanode import get_healthy_endpoints
-from bots.api.helpers import by_key
+from typing import Iterable, Optional
+from bots.api.accounts import AccountsSnapshot, BalanceIndex, fetch_accounts_snapshot
+from bots.api.catalog import AssetRecord, CatalogSnapshot, MarketRecord
+from bots.services.endpoints_monitor import EndpointsMonitor, from_config as endpoints_monitor_from_config
+from bots.services.market_catalog import MarketCatalog
 from bots.http.handler import Handler
+from bots.http.encoded import (
+    EncodedBody,
+    EncodedJson,
+    encode_json,
+    encoded_response,
+    iter_object_chunks,
+    pretty_requested,
+)
+from bots.http.traders_history import TradersChangeSet, TradersHistory, diff_traders
 from bots.wallet.cli import VegaWalletCli
-from dataclasses import dataclass, asdict
+from bots.wallet.state import WalletState
+from dataclasses import dataclass, asdict, astuple, field
 
 
 def is_trader(wallet_name: str) -> bool:
@@ -47,6 +61,39 @@ def _get_party_id_to_wanted_token_map(
     return result
 
 
+refresh_duration = bots.api.metrics.registry.register(
+    bots.api.metrics.Histogram(
+        "traders_cache_refresh_duration_seconds",
+        "Duration of the /traders response rebuild.",
+        buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+    )
+)
+cache_age = bots.api.metrics.registry.register(
+    bots.api.metrics.Gauge("traders_cache_age_seconds", "Age of the cached /traders response.")
+)
+fragments_rebuilt = bots.api.metrics.registry.register(
+    bots.api.metrics.Counter(
+        "traders_fragments_rebuilt_total",
+        "Scenario fragments of the /traders response rebuilt, because their inputs changed.",
+        ["scenario"],
+    )
+)
+
+
+WANTED_TOKENS_ACCOUNT_TYPES = ("ACCOUNT_TYPE_GENERAL", "ACCOUNT_TYPE_MARGIN", "ACCOUNT_TYPE_BOND")
+
+
+def _wallet_state_fingerprint(scenario_wallet_state: Optional[WalletState], parties: Iterable[str]) -> tuple:
+    if scenario_wallet_state is None:
+        return ()
+
+    return tuple(
+        (party, scenario_wallet_state.keys[party].public_key, scenario_wallet_state.keys[party].index)
+        for party in parties
+        if party in scenario_wallet_state.keys
+    )
+
+
 @dataclass
 class WantedToken:
     party_id: str
@@ -60,13 +107,147 @@ class WantedToken:
 @dataclass
 class WalletWantedTokens:
     entries: list[WantedToken]
+    # entries grouped by the party, in the order of entries
+    by_party: dict[str, list[WantedToken]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.by_party = {}
+        for entry in self.entries:
+            self.by_party.setdefault(entry.party_id, []).append(entry)
 
     def as_dict_for_party(self, party_id: str) -> dict:
-        result = []
-        for wanted_token_entry in [entry for entry in self.entries if entry.party_id == party_id]:
-            result = result + [asdict(wanted_token_entry)]
+        return [asdict(entry) for entry in self.by_party.get(party_id, [])]
 
-        return result
+
+@dataclass(frozen=True)
+class TradersQuery:
+    scenarios: frozenset[str]
+    market_ids: frozenset[str]
+    # trader kinds, e.g: market_maker, random_trader
+    kinds: frozenset[str]
+    # dotted paths of returned trader fields, e.g: pubKey, parameters.wantedTokens
+    fields: tuple[str, ...]
+
+
+def _query_values(name: str) -> list[str]:
+    return [
+        value.strip() for arg in flask.request.args.getlist(name) for value in arg.split(",") if len(value.strip()) > 0
+    ]
+
+
+def traders_query_from_request() -> Optional[TradersQuery]:
+    """
+    Returns the filter and projection of traders from the query parameters, e.g:
+    ?scenario=s1,s2&marketId=...&kind=market_maker&fields=pubKey,parameters.wantedTokens
+    Returns None, when the whole document is requested.
+    """
+    query = TradersQuery(
+        scenarios=frozenset(_query_values("scenario")),
+        market_ids=frozenset(_query_values("marketId")),
+        kinds=frozenset(_query_values("kind")),
+        fields=tuple(dict.fromkeys(_query_values("fields"))),
+    )
+
+    if len(query.scenarios) + len(query.market_ids) + len(query.kinds) + len(query.fields) < 1:
+        return None
+
+    return query
+
+
+def _project(trader: dict[str, any], fields: tuple[str, ...]) -> dict[str, any]:
+    result = dict()
+    for field_path in fields:
+        path = field_path.split(".")
+
+        value = trader
+        for part in path:
+            if not isinstance(value, dict) or not part in value:
+                break
+            value = value[part]
+        else:
+            target = result
+            for part in path[:-1]:
+                target = target.setdefault(part, dict())
+            target[path[-1]] = value
+
+    return result
+
+
+class TradersIndex:
+    """
+    Positions of traders in the report, by the scenario, market id and trader kind.
+    """
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self._scenarios: dict[str, str] = {}
+        self._by_scenario: dict[str, set[int]] = {}
+        self._by_market: dict[str, set[int]] = {}
+        self._by_kind: dict[str, set[int]] = {}
+
+    def add(self, trader_key: str, scenario: str, market_id: str, kind: str):
+        position = len(self.keys)
+        self.keys.append(trader_key)
+        self._scenarios[trader_key] = scenario
+        self._by_scenario.setdefault(scenario, set()).add(position)
+        self._by_market.setdefault(market_id, set()).add(position)
+        self._by_kind.setdefault(kind, set()).add(position)
+
+    def scenario(self, trader_key: str) -> Optional[str]:
+        return self._scenarios.get(trader_key, None)
+
+    def select(self, query: TradersQuery) -> list[str]:
+        """
+        Returns keys of traders matching all filters of the query, in the order of the report.
+        """
+        selected = None
+        for values, positions_index in [
+            (query.scenarios, self._by_scenario),
+            (query.market_ids, self._by_market),
+            (query.kinds, self._by_kind),
+        ]:
+            if len(values) < 1:
+                continue
+
+            positions = set().union(*[positions_index.get(value, set()) for value in values])
+            selected = positions if selected is None else selected & positions
+
+        if selected is None:
+            return list(self.keys)
+
+        return [self.keys[position] for position in sorted(selected)]
+
+
+@dataclass
+class ScenarioFragment:
+    scenario: str
+    # empty, when the scenario market is not in the catalog
+    market_id: str
+    traders: dict[str, dict[str, any]]
+    # trader key -> trader kind, e.g: market_maker
+    kinds: dict[str, str]
+
+
+class TradersResponse(EncodedJson):
+    """
+    Encoded traders report with the index of traders recorded while the report was built.
+    """
+
+    def __init__(self, fragments: list[ScenarioFragment]):
+        traders = dict()
+        for fragment in fragments:
+            traders.update(fragment.traders)
+
+        # the body is encoded scenario by scenario
+        super().__init__(
+            {"traders": traders},
+            EncodedBody(iter_object_chunks("traders", [fragment.traders for fragment in fragments])),
+        )
+
+        self.index = TradersIndex()
+        for fragment in fragments:
+            for trader_key in fragment.traders:
+                self.index.add(trader_key, fragment.scenario, fragment.market_id, fragment.kinds[trader_key])
 
 
 class Traders(Handler):
@@ -83,58 +264,235 @@ class Traders(Handler):
         wallet_name: str,
         scenario_wallets: dict[str, ScenarioWallet],
         tokens: list[str],
+        endpoints_monitor: Optional[EndpointsMonitor] = None,
+        balance_index: Optional[BalanceIndex] = None,
+        catalog: Optional[MarketCatalog] = None,
+        background_refresh: bool = False,
+        max_staleness: float = 300.0,
+        history_size: int = 100,
+        build_workers: int = 4,
+        accounts_page_size: Optional[int] = None,
     ):
         self.host = host
         self.port = port
         self.webserver = None
         self.scenarios = scenarios
-        self.api_endpoints = api_endpoints
+        self._api_endpoints = api_endpoints
+        self._endpoints_monitor = endpoints_monitor
+        self._balance_index = balance_index
+        self._accounts_page_size = accounts_page_size
         self.wallet = wallet
         self.wallet_name = wallet_name
         self.scenario_wallets = scenario_wallets
 
-        # TODO: filter by valid market statuses
-        self.markets = by_key(
-            bots.api.datanode.get_markets(api_endpoints, exclude_statuses=['STATE_CLOSED', 'STATE_TERMINATED']),
-            lambda market: market["tradableInstrument"]["instrument"]["name"],
-        )
-        self.assets = by_key(bots.api.datanode.get_assets(api_endpoints), lambda asset: asset["id"])
+        # without the catalog service, markets and assets are downloaded once
+        if catalog is None:
+            catalog = MarketCatalog(lambda: self.api_endpoints, interval=0)
+            catalog.refresh()
+        self.catalog = catalog
 
         self.response_cache = None
         self.cache_lock = multiprocessing.Lock()
         self.invalidate_cache = None
+        # with the background refresh, the cache does not expire after cache_ttl, it is served until max_staleness
+        self.background_refresh = background_refresh
+        self.max_staleness = max_staleness
+        # unix timestamp of the last rebuild
+        self.cache_updated_at = None
+        self.last_refresh_duration = None
+        # per scenario: (fingerprint of the inputs, traders)
+        self._fragments: dict[str, tuple[tuple, ScenarioFragment]] = {}
+        # (public response, recovery phrases, response with recovery phrases)
+        self.authenticated_cache = None
+        self.authenticated_cache_lock = threading.Lock()
+        # versions of the public response with diffs between them, for the /traders/changes
+        self.history = TradersHistory(history_size)
+        # scenario fragments are built concurrently, the executor is shared by all rebuilds
+        self._build_executor = (
+            ThreadPoolExecutor(max_workers=build_workers, thread_name_prefix="traders-build")
+            if build_workers > 1
+            else None
+        )
+        cache_age.set_function(lambda: self.cache_age() or 0.0)
 
         self._tokens = tokens
 
+    @property
+    def api_endpoints(self) -> list[str]:
+        """
+        Healthy endpoints, kept current by the endpoints monitor when it is available.
+        """
+        if self._endpoints_monitor is None:
+            return self._api_endpoints
+
+        healthy_endpoints = self._endpoints_monitor.healthy_endpoints()
+        return healthy_endpoints if len(healthy_endpoints) > 0 else self._api_endpoints
+
     def serve(self):
-        # for authenticated user we do not want to cache the response
-        if self._is_authenticated():
-            Traders.logger.info("Serving response without cache for authenticated user")
-            resp = self.prepare_response()
+        pretty = pretty_requested()
+        query = traders_query_from_request()
+        cached_resp = self.public_response()
+        version = cached_resp.version
+        index = cached_resp.index
+
+        # secrets are added to the public response, and the result has its own cache
+        authenticated = self._is_authenticated()
+        if authenticated:
+            Traders.logger.info("Serving response with secrets for authenticated user")
+            cached_resp = self._authenticated_response(cached_resp, index)
+
+        if query is None:
+            body = cached_resp.body(pretty)
         else:
-            resp = self._cached_response()
-            if resp is None:
-                Traders.logger.info("Refreshing cache for traders response")
-                with self.cache_lock:
-                    cached_resp = self._cached_response()
-                    if not cached_resp is None:
-                        return cached_resp
-
-                    self.response_cache = self.prepare_response()
-                    self.invalidate_cache = datetime.datetime.now() + Traders.cache_ttl
-                    resp = self.response_cache
-            else:
-                Traders.logger.info("Serving traders response from cache")
-
-        json_data = json.dumps({"traders": resp}, indent="    ")
-        resp = flask.Response(json_data)
-        resp.headers["Content-Type"] = "application/json"
+            body = cached_resp.derived(
+                ("query", query, pretty), lambda: self._query_body(cached_resp, index, query, pretty)
+            )
+
+        resp = encoded_response(body)
+        if authenticated:
+            resp.headers["Cache-Control"] = "private"
+
+        resp.headers["Age"] = str(int(self.cache_age() or 0))
+        resp.headers["X-Traders-Version"] = str(version)
         return resp
 
-    def _cached_response(self) -> Optional[dict[str, dict[str, any]]]:
+    def changes(self, since: Optional[int]) -> TradersChangeSet:
+        """
+        Returns public changes of traders since the given version, the cache is refreshed first when it is too old.
+        """
+        self.public_response()
+
+        return self.history.changes_since(since)
+
+    def _query_body(
+        self, cached_resp: EncodedJson, index: TradersIndex, query: TradersQuery, pretty: bool
+    ) -> EncodedBody:
+        traders = cached_resp.payload["traders"]
+
+        return encode_json(
+            {
+                "traders": {
+                    trader_key: (
+                        _project(traders[trader_key], query.fields) if len(query.fields) > 0 else traders[trader_key]
+                    )
+                    for trader_key in index.select(query)
+                }
+            },
+            pretty,
+        )
+
+    def public_response(self) -> TradersResponse:
+        """
+        Returns the cached report without secrets, it is rebuilt first when it is too old.
+        """
+        cached_resp = self._cached_response()
+        if cached_resp is None:
+            Traders.logger.info("Refreshing cache for traders response")
+            with self.cache_lock:
+                cached_resp = self._cached_response()
+                if cached_resp is None:
+                    cached_resp = self._refresh_cache()
+        else:
+            Traders.logger.info("Serving traders response from cache")
+
+        return cached_resp
+
+    def _authenticated_response(self, public_resp: TradersResponse, index: TradersIndex) -> EncodedJson:
+        """
+        Returns the public response with recovery phrases of the scenario wallets. It is rebuilt
+        only when the public response or recovery phrases change.
+        """
+        secrets = self._scenarios_secrets()
+        with self.authenticated_cache_lock:
+            if not self.authenticated_cache is None:
+                cached_public_resp, cached_secrets, cached_resp = self.authenticated_cache
+                if cached_public_resp is public_resp and cached_secrets == secrets:
+                    return cached_resp
+
+            authenticated_resp = EncodedJson(
+                {"traders": self._overlay_secrets(public_resp.payload["traders"], index, secrets)}
+            )
+            self.authenticated_cache = (public_resp, secrets, authenticated_resp)
+
+            return authenticated_resp
+
+    def _scenarios_secrets(self) -> dict[str, str]:
+        wallet_state = self.wallet.state
+
+        # wallets synced from the wallet binary have no recovery phrase in the state
+        return {
+            scenario: wallet_state[scenario].recovery_phrase
+            for scenario in self.scenarios
+            if scenario in wallet_state and len(wallet_state[scenario].recovery_phrase) > 0
+        }
+
+    def _overlay_secrets(
+        self, traders: dict[str, dict[str, any]], index: TradersIndex, secrets: dict[str, str]
+    ) -> dict[str, dict[str, any]]:
+        result = dict()
+        for trader_key, trader in traders.items():
+            scenario = index.scenario(trader_key)
+            if not scenario in secrets:
+                result[trader_key] = trader
+                continue
+
+            result[trader_key] = dict(trader)
+            result[trader_key]["wallet"] = dict(trader["wallet"], recoveryPhrase=secrets[scenario])
+
+        return result
+
+    def refresh_cache(self) -> TradersResponse:
+        """
+        Rebuild the cached response. Requests are served from the previous one until it is done.
+        """
+        with self.cache_lock:
+            return self._refresh_cache()
+
+    def _refresh_cache(self) -> TradersResponse:
+        started = time.monotonic()
+        fragments = self._prepare_fragments()
+        traders = dict()
+        for fragment in fragments:
+            traders.update(fragment.traders)
+
+        diff = diff_traders(self.history.traders, traders)
+        if self.response_cache is None or not diff.is_empty():
+            cached_resp = TradersResponse(fragments)
+            cached_resp.version = self.history.record(diff, cached_resp.payload["traders"])
+        else:
+            # the same payload keeps its version, ETag and memoized values
+            cached_resp = self.response_cache
+
+        self.last_refresh_duration = time.monotonic() - started
+        refresh_duration.observe(self.last_refresh_duration)
+
+        self.response_cache = cached_resp
+        self.cache_updated_at = time.time()
+        self.invalidate_cache = datetime.datetime.now() + Traders.cache_ttl
+        Traders.logger.info(f"The /traders response rebuilt in {self.last_refresh_duration:.2f}s")
+
+        return cached_resp
+
+    def cache_age(self) -> Optional[float]:
+        """
+        Seconds since the last rebuild of the cached response, None before the first one.
+        """
+        if self.cache_updated_at is None:
+            return None
+
+        return time.time() - self.cache_updated_at
+
+    def _cached_response(self) -> Optional[TradersResponse]:
         if self.invalidate_cache is None:
             return None
 
+        if self.background_refresh:
+            if self.cache_age() > self.max_staleness:
+                Traders.logger.warning(f"The /traders response is older than {self.max_staleness} seconds")
+                return None
+
+            return self.response_cache
+
         if datetime.datetime.now() > self.invalidate_cache:
             Traders.logger.info("The /traders response cache is too old")
             return None
@@ -155,181 +513,217 @@ class Traders(Handler):
 
         return authorization_token in self._tokens
 
-    def prepare_response(self) -> dict[str, dict[str, any]]:
+    def _prepare_fragments(self) -> list[ScenarioFragment]:
+        """
+        Returns traders of every scenario, in the order of scenarios.
+        """
         wallet_state = self.wallet.state
+        # all scenarios of the rebuild see the same markets and assets
+        catalog = self.catalog.snapshot
+
+        # accounts for all scenarios are downloaded once per refresh, most scenarios share settlement assets
+        scenarios_keys = {scenario: self.wallet.indexed_keys(scenario) for scenario in self.scenarios}
+        accounts_snapshot = self._fetch_accounts_snapshot(catalog, scenarios_keys)
+        # totals are aggregated once per asset upfront, scenarios built concurrently only read them
+        for asset_id in self._tracked_assets_and_parties(catalog, scenarios_keys)[0]:
+            accounts_snapshot.party_totals(asset_id, WANTED_TOKENS_ACCOUNT_TYPES)
+
+        def build(scenario: str) -> ScenarioFragment:
+            return self._scenario_traders(
+                scenario,
+                scenarios_keys[scenario],
+                wallet_state.get(scenario, None),
+                catalog,
+                accounts_snapshot,
+            )
 
-        traders = dict()
-        for scenario in self.scenarios:
-            scenario_config = self.scenarios[scenario]
-            scenario_market_name = scenario_config.market_name
-            if not scenario_market_name in self.markets:
-                Traders.logger.error(
-                    f"Market {scenario_market_name} not found in market downloaded from API, traders cannot be reported. There is a config for given market_name"
-                )
+        if self._build_executor is None:
+            return [build(scenario) for scenario in self.scenarios]
+
+        # map keeps the order of scenarios, so the merged report does not depend on the order of completion
+        return list(self._build_executor.map(build, self.scenarios))
 
-            scenario_market = self.markets[scenario_market_name]
-            assets_ids = self._vega_asset_id_for_market(scenario_market)
-            market_id = scenario_market["id"]
-            market_tags = self._metadata_for_market(scenario_market)
-
-            base = market_tags["ticker"] if "ticker" in market_tags else ""
-            base = market_tags["base"] if "base" in market_tags else base
-
-            wallet_keys = self.wallet.list_keys(scenario)
-            wanted_balances = _get_party_id_to_wanted_token_map(scenario_config, wallet_keys)
-            assets_ids = self._vega_asset_id_for_market(scenario_market)
-            balances = self._compute_wanted_tokens_for_wallet(
-                market_id,
-                assets_ids,
-                wallet_keys.values(),
-                wanted_balances,
+    def _scenario_traders(
+        self,
+        scenario: str,
+        wallet_keys: dict[str, str],
+        scenario_wallet_state: Optional[WalletState],
+        catalog: CatalogSnapshot,
+        accounts_snapshot: AccountsSnapshot,
+    ) -> ScenarioFragment:
+        """
+        Returns the public report fragment for the scenario traders. Fragments are cached
+        and rebuilt only when the fingerprint of their inputs changes.
+        """
+        scenario_config = self.scenarios[scenario]
+        scenario_market_name = scenario_config.market_name
+        if not scenario_market_name in catalog.markets:
+            Traders.logger.error(
+                f"Market {scenario_market_name} not found in market downloaded from API, traders cannot be reported. There is a config for given market_name"
             )
+            # the market may be closed or not proposed yet, other scenarios are still reported
+            return ScenarioFragment(scenario, "", dict(), dict())
+
+        scenario_market = catalog.markets[scenario_market_name]
+        market_id = scenario_market.id
+
+        wanted_balances = _get_party_id_to_wanted_token_map(scenario_config, wallet_keys)
+        balances = self._compute_wanted_tokens_for_wallet(
+            market_id,
+            self._erc20_assets(catalog, scenario_market),
+            wallet_keys.values(),
+            wanted_balances,
+            accounts_snapshot,
+        )
 
-            scenario_wallet_state = wallet_state.get(scenario, None)
-
-            reported_wallets_count = {}
-            for wallet_name in wallet_keys:
-                if not is_trader(wallet_name):
-                    continue
-
-                trader_pub_key = wallet_keys[wallet_name]
-                trader_kind = get_config_attr_name(wallet_name)
-                trader_params = getattr(scenario_config, trader_kind)
-                # check if we already returned all required wallets. We do not want to return more than enough.
-                if is_enough_wallets_reported(trader_kind, trader_params, reported_wallets_count):
-                    continue
-
-                reported_wallets_for_trader_kind = reported_wallets_count.get(trader_kind, 0)
-                reported_wallets_count[trader_kind] = reported_wallets_for_trader_kind + 1
-
-                trader_key = f"{scenario}_{market_id}_{wallet_name}"
-                traders[trader_key] = {
-                    "name": f"{market_id}_{wallet_name}",
-                    "pubKey": trader_pub_key,
-                    "parameters": {
-                        "marketBase": base,
-                        "marketQuote": market_tags["quote"] if "quote" in market_tags else "",
-                        # "marketSettlementEthereumContractAddress": scenario_asset["details"]["erc20"][
-                        #     "contractAddress"
-                        # ],
-                        # "marketSettlementVegaAssetID": vega_asset_id,
-                        "wantedTokens": balances.as_dict_for_party(trader_pub_key),
-                        # "wantedTokens": trader_params.initial_mint,
-                        # "balance": float(trader_balance)
-                        # / (pow(10, int(self.assets[vega_asset_id]["details"]["decimals"]))),
-                        "enableTopUp": scenario_config.enable_top_up,
-                    },
-                }
+        fingerprint = (
+            tuple(wallet_keys.items()),
+            scenario_market,
+            tuple(astuple(entry) for entry in balances.entries),
+            _wallet_state_fingerprint(scenario_wallet_state, wallet_keys.values()),
+        )
+        if scenario in self._fragments and self._fragments[scenario][0] == fingerprint:
+            return self._fragments[scenario][1]
 
-                public_key = "*** unknown ***"
-                index = -1
-                if scenario_wallet_state is not None and trader_pub_key in scenario_wallet_state.keys:
-                    public_key = scenario_wallet_state.keys[trader_pub_key].public_key
-                    index = scenario_wallet_state.keys[trader_pub_key].index
+        traders = dict()
+        kinds = dict()
+        reported_wallets_count = {}
+        for wallet_name in wallet_keys:
+            if not is_trader(wallet_name):
+                continue
 
-                traders[trader_key]["wallet"] = {
-                    "index": index,
-                    "publicKey": public_key,
-                }
+            trader_pub_key = wallet_keys[wallet_name]
+            trader_kind = get_config_attr_name(wallet_name)
+            trader_params = getattr(scenario_config, trader_kind)
+            # check if we already returned all required wallets. We do not want to return more than enough.
+            if is_enough_wallets_reported(trader_kind, trader_params, reported_wallets_count):
+                continue
 
-                if scenario_wallet_state is not None and self._is_authenticated():
-                    traders[trader_key]["wallet"]["recoveryPhrase"] = scenario_wallet_state.recovery_phrase
+            reported_wallets_for_trader_kind = reported_wallets_count.get(trader_kind, 0)
+            reported_wallets_count[trader_kind] = reported_wallets_for_trader_kind + 1
+
+            trader_key = f"{scenario}_{market_id}_{wallet_name}"
+            kinds[trader_key] = trader_kind
+            traders[trader_key] = {
+                "name": f"{market_id}_{wallet_name}",
+                "pubKey": trader_pub_key,
+                "parameters": {
+                    "marketBase": scenario_market.base,
+                    "marketQuote": scenario_market.quote,
+                    # "marketSettlementEthereumContractAddress": scenario_asset["details"]["erc20"][
+                    #     "contractAddress"
+                    # ],
+                    # "marketSettlementVegaAssetID": vega_asset_id,
+                    "wantedTokens": balances.as_dict_for_party(trader_pub_key),
+                    # "wantedTokens": trader_params.initial_mint,
+                    # "balance": float(trader_balance)
+                    # / (pow(10, int(self.assets[vega_asset_id]["details"]["decimals"]))),
+                    "enableTopUp": scenario_config.enable_top_up,
+                },
+            }
+
+            public_key = "*** unknown ***"
+            index = -1
+            if scenario_wallet_state is not None and trader_pub_key in scenario_wallet_state.keys:
+                public_key = scenario_wallet_state.keys[trader_pub_key].public_key
+                index = scenario_wallet_state.keys[trader_pub_key].index
+
+            traders[trader_key]["wallet"] = {
+                "index": index,
+                "publicKey": public_key,
+            }
+
+        fragment = ScenarioFragment(scenario, market_id, traders, kinds)
+        fragments_rebuilt.inc(scenario=scenario)
+        self._fragments[scenario] = (fingerprint, fragment)
+
+        return fragment
+
+    def tracked_parties(self) -> list[str]:
+        """
+        Returns parties, whose balances are reported.
+        """
+        return self._tracked_assets_and_parties(
+            self.catalog.snapshot,
+            {scenario: self.wallet.indexed_keys(scenario) for scenario in self.scenarios},
+        )[1]
+
+    def _tracked_assets_and_parties(
+        self, catalog: CatalogSnapshot, scenarios_keys: dict[str, dict[str, str]]
+    ) -> tuple[list[str], list[str]]:
+        asset_ids = set()
+        parties = set()
+        for scenario in scenarios_keys:
+            scenario_market_name = self.scenarios[scenario].market_name
+            if not scenario_market_name in catalog.markets:
+                continue
 
-        return traders
+            asset_ids.update(asset.id for asset in self._erc20_assets(catalog, catalog.markets[scenario_market_name]))
+            parties.update(scenarios_keys[scenario].values())
 
-    def _compute_wanted_tokens_for_wallet(
-        self,
-        market_id: str,
-        assets_ids: list[str],
-        wallet_keys: list[str],
-        party_id_to_wanted_balance_map: dict[str, float],
-    ) -> WalletWantedTokens:
-        entries = []
+        return (sorted(asset_ids), sorted(parties))
+
+    def _fetch_accounts_snapshot(
+        self, catalog: CatalogSnapshot, scenarios_keys: dict[str, dict[str, str]]
+    ) -> AccountsSnapshot:
+        asset_ids, parties = self._tracked_assets_and_parties(catalog, scenarios_keys)
+
+        # balances kept current by the accounts stream do not need any network call
+        if not self._balance_index is None and self._balance_index.covers(parties):
+            Traders.logger.info("Using balances from the accounts stream")
+            return self._balance_index
+
+        return fetch_accounts_snapshot(self.api_endpoints, asset_ids, parties, self._accounts_page_size)
 
-        for asset_id in assets_ids:
-            if not asset_id in self.assets:
+    def _erc20_assets(self, catalog: CatalogSnapshot, market: MarketRecord) -> list[AssetRecord]:
+        result = []
+
+        for asset_id in market.asset_ids:
+            if not asset_id in catalog.assets:
                 Traders.logger.error(f"Missing asset {asset_id} on the network")
 
                 raise RuntimeError(f"Missing asset {asset_id} on the network")
-            asset = self.assets[asset_id]
+            asset = catalog.assets[asset_id]
 
-            if not "erc20" in asset["details"]:
+            if asset.erc20_address is None:
                 Traders.logger.error(
                     f"Market created for non ERC20 asset({asset_id}). NON ERC20 assets are not supported"
                 )
                 continue
 
-            accounts = bots.api.datanode.get_accounts(self.api_endpoints, asset_id)
-            # create mapping party_id => balance
-
-            party_to_balance_map = {}
-            for account in accounts:
-                if account.owner not in party_to_balance_map:
-                    party_to_balance_map[account.owner] = 0.0
+            result.append(asset)
 
-                if account.market_id not in ["", market_id]:
-                    continue
-
-                if not account.type in ["ACCOUNT_TYPE_GENERAL", "ACCOUNT_TYPE_MARGIN", "ACCOUNT_TYPE_BOND"]:
-                    continue
+        return result
 
-                party_to_balance_map[account.owner] += float(account.balance) / (
-                    pow(10, int(asset["details"]["decimals"]))
-                )
+    def _compute_wanted_tokens_for_wallet(
+        self,
+        market_id: str,
+        assets: list[AssetRecord],
+        wallet_keys: list[str],
+        party_id_to_wanted_balance_map: dict[str, float],
+        accounts_snapshot: AccountsSnapshot,
+    ) -> WalletWantedTokens:
+        entries = []
 
+        for asset in assets:
+            # general accounts have no market, margin and bond accounts belong to the scenario market
+            totals = accounts_snapshot.party_totals(asset.id, WANTED_TOKENS_ACCOUNT_TYPES)
             for party_id in wallet_keys:
-                entries = entries + [
+                party_balance = totals.get((party_id, ""), 0) + totals.get((party_id, market_id), 0)
+
+                entries.append(
                     WantedToken(
                         party_id=party_id,
-                        symbol=asset["details"]["symbol"],
-                        vega_asset_id=asset["id"],
-                        asset_erc20_address=asset["details"]["erc20"]["contractAddress"],
-                        balance=(party_to_balance_map[party_id] if party_id in party_to_balance_map else 0.0),
-                        wanted_tokens=(
-                            party_id_to_wanted_balance_map[party_id]
-                            if party_id in party_id_to_wanted_balance_map
-                            else 0.0
-                        ),
+                        symbol=asset.symbol,
+                        vega_asset_id=asset.id,
+                        asset_erc20_address=asset.erc20_address,
+                        balance=float(party_balance) / asset.scale,
+                        wanted_tokens=party_id_to_wanted_balance_map.get(party_id, 0.0),
                     )
-                ]
+                )
 
         return WalletWantedTokens(entries)
 
-    def _vega_asset_id_for_market(self, market: dict[str, any]) -> list[str]:
-        if not "tradableInstrument" in market:
-            return None
-
-        if not "instrument" in market["tradableInstrument"]:
-            return None
-
-        if "future" in market["tradableInstrument"]["instrument"]:
-            return [market["tradableInstrument"]["instrument"]["future"]["settlementAsset"]]
-
-        if "perpetual" in market["tradableInstrument"]["instrument"]:
-            return [market["tradableInstrument"]["instrument"]["perpetual"]["settlementAsset"]]
-
-        if "spot" in market["tradableInstrument"]["instrument"]:
-            return [
-                market["tradableInstrument"]["instrument"]["spot"]["quoteAsset"],
-                market["tradableInstrument"]["instrument"]["spot"]["baseAsset"],
-            ]
-
-    def _metadata_for_market(self, market: dict[str, any]) -> dict[str, str]:
-        if not "tradableInstrument" in market:
-            return dict()
-        if not "instrument" in market["tradableInstrument"]:
-            return dict()
-        if not "metadata" in market["tradableInstrument"]["instrument"]:
-            return dict()
-        if not "tags" in market["tradableInstrument"]["instrument"]["metadata"]:
-            return dict()
-
-        return {
-            item.split(":")[0]: item.split(":")[1]
-            for item in market["tradableInstrument"]["instrument"]["metadata"]["tags"]
-            if len(item.split(":")) >= 2
-        }
-
 
 def is_enough_wallets_reported(trader_type: str, traders_params: any, reported_traders: dict[str, int]) -> bool:
     """
@@ -346,8 +740,14 @@ def from_config(
     wallet_cli: VegaWalletCli,
     scenario_wallets: dict[str, ScenarioWallet],
     tokens: list[str],
+    endpoints_monitor: Optional[EndpointsMonitor] = None,
+    balance_index: Optional[BalanceIndex] = None,
+    catalog: Optional[MarketCatalog] = None,
 ) -> Traders:
-    healthy_rest_endpoints = get_healthy_endpoints(config.network_config.api.rest.hosts)
+    # probing is expensive, callers which already monitor the network pass the monitor here
+    if endpoints_monitor is None:
+        endpoints_monitor = endpoints_monitor_from_config(config.datanode, config.network_config.api.rest.hosts)
+    healthy_rest_endpoints = endpoints_monitor.healthy_endpoints()
     if len(healthy_rest_endpoints) < 1:
         raise Exception("There is no healthy rest data-node in the network when creating Traders from config")
 
@@ -356,6 +756,15 @@ def from_config(
         port=config.http_server.port,
         scenarios=config.scenarios,
         api_endpoints=healthy_rest_endpoints,
+        endpoints_monitor=endpoints_monitor,
+        balance_index=balance_index,
+        catalog=catalog,
+        background_refresh=config.traders_cache.background_refresh,
+        max_staleness=config.traders_cache.max_staleness,
+        history_size=config.traders_cache.history_size,
+        build_workers=config.traders_cache.build_workers,
+        # 0 leaves the page size to the data-node
+        accounts_page_size=config.datanode.accounts_page_size if config.datanode.accounts_page_size > 0 else None,
         wallet=wallet_cli,
         wallet_name=config.wallet.wallet_name,
         scenario_wallets=scenario_wallets,
@@ -0,0 +1,134 @@
+import threading
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class TradersDiff:
+    added: dict[str, dict[str, any]] = field(default_factory=dict)
+    changed: dict[str, dict[str, any]] = field(default_factory=dict)
+    removed: set[str] = field(default_factory=set)
+
+    def is_empty(self) -> bool:
+        return len(self.added) + len(self.changed) + len(self.removed) < 1
+
+    def merge(self, newer: "TradersDiff"):
+        """
+        Apply the newer diff on top of this one, the result is the diff between
+        the base of this diff and the result of the newer one.
+        """
+        for trader_key, trader in newer.added.items():
+            if trader_key in self.removed:
+                # existed in the base, removed and added back
+                self.removed.discard(trader_key)
+                self.changed[trader_key] = trader
+            else:
+                self.added[trader_key] = trader
+
+        for trader_key, trader in newer.changed.items():
+            if trader_key in self.added:
+                self.added[trader_key] = trader
+            else:
+                self.changed[trader_key] = trader
+
+        for trader_key in newer.removed:
+            if trader_key in self.added:
+                # did not exist in the base
+                del self.added[trader_key]
+            else:
+                self.changed.pop(trader_key, None)
+                self.removed.add(trader_key)
+
+    def as_dict(self) -> dict[str, any]:
+        return {"added": self.added, "changed": self.changed, "removed": sorted(self.removed)}
+
+
+def diff_traders(old: dict[str, dict[str, any]], new: dict[str, dict[str, any]]) -> TradersDiff:
+    diff = TradersDiff()
+    for trader_key, trader in new.items():
+        if not trader_key in old:
+            diff.added[trader_key] = trader
+        # unchanged scenario fragments are reused, so most entries are the same objects
+        elif not old[trader_key] is trader and old[trader_key] != trader:
+            diff.changed[trader_key] = trader
+
+    diff.removed = {trader_key for trader_key in old if not trader_key in new}
+
+    return diff
+
+
+@dataclass
+class TradersChangeSet:
+    version: int
+    since: Optional[int]
+    # None, when the since version is too old and the full snapshot is returned
+    diff: Optional[TradersDiff]
+    traders: dict[str, dict[str, any]]
+
+    def as_dict(self) -> dict[str, any]:
+        if self.diff is None:
+            return {"version": self.version, "full": True, "traders": self.traders}
+
+        return {"version": self.version, "since": self.since, "full": False, **self.diff.as_dict()}
+
+
+class TradersHistory:
+    """
+    Bounded history of diffs between consecutive versions of the traders report.
+    Version 0 is the empty report before the first build.
+    """
+
+    def __init__(self, max_size: int):
+        self.version = 0
+        # traders of the current version
+        self.traders: dict[str, dict[str, any]] = {}
+        # (version, diff from the previous version)
+        self._diffs: deque[tuple[int, TradersDiff]] = deque(maxlen=max_size)
+        self._condition = threading.Condition()
+
+    def record(self, diff: TradersDiff, traders: dict[str, dict[str, any]]) -> int:
+        """
+        Record traders as the next version with the diff from the previous one, returns the version.
+        """
+        with self._condition:
+            self.version += 1
+            self.traders = traders
+            self._diffs.append((self.version, diff))
+            self._condition.notify_all()
+
+            return self.version
+
+    def changes_since(self, since: Optional[int]) -> TradersChangeSet:
+        """
+        Returns changes between the since version and the current one. The full snapshot is returned
+        instead, when the since version is not in the history anymore, or it is not valid.
+        """
+        with self._condition:
+            if since == self.version:
+                return TradersChangeSet(self.version, since, TradersDiff(), self.traders)
+
+            if since is None or since < 0 or since > self.version:
+                return TradersChangeSet(self.version, since, None, self.traders)
+
+            # the oldest kept diff applies on top of the version before it
+            if len(self._diffs) < 1 or since < self._diffs[0][0] - 1:
+                return TradersChangeSet(self.version, since, None, self.traders)
+
+            result = TradersDiff()
+            for version, diff in self._diffs:
+                if version > since:
+                    result.merge(diff)
+
+            return TradersChangeSet(self.version, since, result, self.traders)
+
+    def wait_for_newer(self, version: int, timeout: float) -> int:
+        """
+        Wait until a version newer than the given one is recorded, or the timeout.
+        Returns the current version.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version, timeout)
+
+            return self.version
@@ -0,0 +1,105 @@
+import logging
+import threading
+import bots.api.datanode
+import bots.config.types
+
+from typing import Callable
+from bots.api.accounts import BalanceIndex
+from bots.services.service import Service
+from bots.services.multiprocessing import threaded
+
+
+class AccountsStreamService(Service):
+    """
+    Keeps the balance index current with the data-node account updates streams.
+
+    There is a single stream per tracked party, filtered by the data-node. Tracked parties
+    are re-read from the subscription callback on every interval, streams of parties which
+    are not tracked anymore end with their next message or read timeout.
+    """
+
+    logger = logging.getLogger("accounts-stream")
+
+    def __init__(
+        self,
+        index: BalanceIndex,
+        endpoints: Callable[[], list[str]],
+        subscription: Callable[[], list[str]],
+        read_timeout: float,
+        reconnect_delay: float,
+        interval: float,
+    ) -> None:
+        self.index = index
+        self.endpoints = endpoints
+        self.subscription = subscription
+        self.read_timeout = read_timeout
+        self.reconnect_delay = reconnect_delay
+        self.interval = interval
+
+        self._streams: dict[str, threading.Thread] = {}
+        self._stop = threading.Event()
+
+    def check(self):
+        pass
+
+    def wait(self):
+        pass
+
+    def _sync_subscription(self):
+        parties = self.subscription()
+        self.index.track_parties(parties)
+
+        for party_id in parties:
+            if party_id in self._streams and self._streams[party_id].is_alive():
+                continue
+
+            thread = threading.Thread(target=self._observe, args=(party_id,), daemon=True)
+            thread.start()
+            self._streams[party_id] = thread
+
+    def _observe(self, party_id: str):
+        while not self._stop.is_set() and party_id in self.index.parties:
+            try:
+                AccountsStreamService.logger.info(f"Subscribing to accounts of party {party_id}")
+                for update in bots.api.datanode.observe_accounts(self.endpoints(), party_id, self.read_timeout):
+                    self.index.apply(party_id, update)
+                    if self._stop.is_set() or not party_id in self.index.parties:
+                        break
+            except Exception as e:
+                # read timeouts end up here as well, the stream is reopened with a fresh snapshot
+                AccountsStreamService.logger.info(f"Accounts stream for party {party_id} closed: {str(e)}")
+
+            self.index.mark_not_ready(party_id)
+            if party_id in self.index.parties:
+                self._stop.wait(self.reconnect_delay)
+
+    @threaded
+    def start(self):
+        AccountsStreamService.logger.info("Starting account streams")
+        while True:
+            try:
+                self._sync_subscription()
+            except Exception as e:
+                AccountsStreamService.logger.error(f"Failed to update account streams subscription: {str(e)}")
+
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+
+def from_config(
+    config: bots.config.types.DataNodeConfig,
+    index: BalanceIndex,
+    endpoints: Callable[[], list[str]],
+    subscription: Callable[[], list[str]],
+) -> AccountsStreamService:
+    return AccountsStreamService(
+        index=index,
+        endpoints=endpoints,
+        subscription=subscription,
+        read_timeout=config.accounts_stream_read_timeout,
+        reconnect_delay=config.accounts_stream_reconnect_delay,
+        interval=config.accounts_stream_subscription_interval,
+    )
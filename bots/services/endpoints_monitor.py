@@ -0,0 +1,107 @@
+import time
+import logging
+import threading
+import bots.api.types
+import bots.config.types
+
+from dataclasses import dataclass, field
+from bots.api.datanode import probe_endpoints, rank_endpoints
+from bots.services.service import Service
+from bots.services.multiprocessing import threaded
+
+
+@dataclass(frozen=True)
+class EndpointsSnapshot:
+    # healthy endpoints, ordered from the best one
+    ranking: tuple[bots.api.types.EndpointHealth, ...] = field(default_factory=tuple)
+    # all endpoints which responded to the probe
+    probes: tuple[bots.api.types.EndpointHealth, ...] = field(default_factory=tuple)
+    max_height: int = 0
+    # unix timestamp of the probe
+    updated_at: float = 0.0
+
+
+class EndpointsMonitor(Service):
+    """
+    Refreshes the set of healthy data-nodes from their /statistics endpoint in the background
+    """
+
+    logger = logging.getLogger("endpoints-monitor")
+
+    def __init__(
+        self,
+        endpoints: list[str],
+        interval: float,
+        max_allowed_lag_blocks: int,
+        probe_timeout: float,
+    ) -> None:
+        self.endpoints = endpoints
+        self.interval = interval
+        self.max_allowed_lag_blocks = max_allowed_lag_blocks
+        self.probe_timeout = probe_timeout
+
+        self._snapshot = EndpointsSnapshot()
+        self._stop = threading.Event()
+
+    @property
+    def snapshot(self) -> EndpointsSnapshot:
+        return self._snapshot
+
+    def healthy_endpoints(self) -> list[str]:
+        return [probe.endpoint for probe in self._snapshot.ranking]
+
+    def refresh(self) -> EndpointsSnapshot:
+        probes = probe_endpoints(self.endpoints, self.probe_timeout)
+        ranking = rank_endpoints(probes, self.max_allowed_lag_blocks)
+
+        if len(ranking) < 1:
+            EndpointsMonitor.logger.warning("No healthy data-node found, keeping the previous list of endpoints")
+            return self._snapshot
+
+        previous_endpoints = self.healthy_endpoints()
+        self._snapshot = EndpointsSnapshot(
+            ranking=tuple(ranking),
+            probes=tuple(probes),
+            max_height=max(probe.core_height for probe in probes),
+            updated_at=time.time(),
+        )
+
+        if previous_endpoints != self.healthy_endpoints():
+            EndpointsMonitor.logger.info(f"Healthy data-nodes changed to: {', '.join(self.healthy_endpoints())}")
+
+        return self._snapshot
+
+    def check(self):
+        if len(self.endpoints) < 1:
+            raise Exception("No data-node endpoints to monitor")
+
+    def wait(self):
+        pass
+
+    @threaded
+    def start(self):
+        EndpointsMonitor.logger.info(f"Monitoring data-nodes health every {self.interval} seconds")
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                EndpointsMonitor.logger.error(f"Failed to refresh data-nodes health: {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def from_config(
+    config: bots.config.types.DataNodeConfig, endpoints: list[str], refresh: bool = True
+) -> EndpointsMonitor:
+    monitor = EndpointsMonitor(
+        endpoints=endpoints,
+        interval=config.health_check_interval,
+        max_allowed_lag_blocks=config.max_allowed_lag_blocks,
+        probe_timeout=config.probe_timeout,
+    )
+
+    if refresh:
+        monitor.refresh()
+
+    return monitor
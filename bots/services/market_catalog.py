@@ -0,0 +1,97 @@
+import logging
+import threading
+import bots.api.datanode
+import bots.config.types
+
+from typing import Callable, Iterable
+from bots.api.catalog import CatalogSnapshot, build_catalog_snapshot
+from bots.services.service import Service
+from bots.services.multiprocessing import threaded
+
+# markets in these states do not trade anymore, scenarios are not reported for them
+DEFAULT_EXCLUDED_MARKET_STATES = ("STATE_CLOSED", "STATE_TERMINATED")
+
+
+class MarketCatalog(Service):
+    """
+    Refreshes markets and assets of the network in the background
+    """
+
+    logger = logging.getLogger("market-catalog")
+
+    def __init__(
+        self,
+        endpoints: Callable[[], list[str]],
+        interval: float,
+        exclude_states: Iterable[str] = DEFAULT_EXCLUDED_MARKET_STATES,
+    ) -> None:
+        self.endpoints = endpoints
+        self.interval = interval
+        self.exclude_states = tuple(exclude_states)
+
+        self._snapshot = CatalogSnapshot()
+        self._stop = threading.Event()
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    def refresh(self) -> CatalogSnapshot:
+        endpoints = self.endpoints()
+        previous = self._snapshot
+        self._snapshot = build_catalog_snapshot(
+            previous,
+            bots.api.datanode.get_markets(endpoints),
+            bots.api.datanode.get_assets(endpoints),
+            self.exclude_states,
+        )
+
+        if not self._snapshot is previous:
+            self._log_changes(previous, self._snapshot)
+
+        return self._snapshot
+
+    def _log_changes(self, previous: CatalogSnapshot, current: CatalogSnapshot):
+        for market_id, market in current.markets_by_id.items():
+            if not market_id in previous.markets_by_id:
+                MarketCatalog.logger.info(f"New market {market.name}({market_id}) in state {market.state}")
+            elif previous.markets_by_id[market_id].state != market.state:
+                MarketCatalog.logger.info(f"Market {market.name}({market_id}) changed state to {market.state}")
+
+        for market_id, market in previous.markets_by_id.items():
+            if not market_id in current.markets_by_id:
+                MarketCatalog.logger.info(f"Market {market.name}({market_id}) removed")
+
+        for asset_id, asset in current.assets.items():
+            if not asset_id in previous.assets:
+                MarketCatalog.logger.info(f"New asset {asset.symbol}({asset_id})")
+
+    def check(self):
+        if self.interval <= 0:
+            raise Exception("The market catalog refresh interval must be positive")
+
+    def wait(self):
+        pass
+
+    @threaded
+    def start(self):
+        MarketCatalog.logger.info(f"Refreshing markets and assets every {self.interval} seconds")
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                MarketCatalog.logger.error(f"Failed to refresh markets and assets: {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def from_config(
+    config: bots.config.types.DataNodeConfig, endpoints: Callable[[], list[str]], refresh: bool = True
+) -> MarketCatalog:
+    catalog = MarketCatalog(endpoints=endpoints, interval=config.catalog_refresh_interval)
+
+    if refresh:
+        catalog.refresh()
+
+    return catalog
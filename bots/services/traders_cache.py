@@ -0,0 +1,50 @@
+import logging
+import threading
+import bots.config.types
+
+from bots.http.traders_handler import Traders
+from bots.services.service import Service
+from bots.services.multiprocessing import threaded
+
+
+class TradersCacheRefresher(Service):
+    """
+    Rebuilds the cached /traders response in the background, before it gets old.
+
+    The first rebuild runs in wait, before the http server starts, so the first
+    request does not wait for a cold cache. Failed rebuilds keep the previous response.
+    """
+
+    logger = logging.getLogger("traders-cache")
+
+    def __init__(self, traders: Traders, interval: float) -> None:
+        self.traders = traders
+        self.interval = interval
+
+        self._stop = threading.Event()
+
+    def check(self):
+        if self.interval <= 0:
+            raise Exception("The /traders cache refresh interval must be positive")
+
+    def wait(self):
+        self._refresh()
+
+    def _refresh(self):
+        try:
+            self.traders.refresh_cache()
+        except Exception as e:
+            TradersCacheRefresher.logger.error(f"Failed to refresh the /traders response: {str(e)}")
+
+    @threaded
+    def start(self):
+        TradersCacheRefresher.logger.info(f"Refreshing the /traders response every {self.interval} seconds")
+        while not self._stop.wait(self.interval):
+            self._refresh()
+
+    def stop(self):
+        self._stop.set()
+
+
+def from_config(config: bots.config.types.TradersCacheConfig, traders: Traders) -> TradersCacheRefresher:
+    return TradersCacheRefresher(traders=traders, interval=config.refresh_interval)
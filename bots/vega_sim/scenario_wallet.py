@@ -47,7 +47,7 @@ def from_config(
             wallet_cli.generate_api_token(wallet_name)
             existing_key_pairs = dict()
         else:
-            wallet_keys = wallet_cli.list_keys(wallet_name)
+            wallet_keys = wallet_cli.resync_keys(wallet_name)
 
         if not scenario_wallet.market_creator_agent.key_name in wallet_keys:
             logging.info(
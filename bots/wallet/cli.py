@@ -139,6 +139,30 @@ class VegaWalletCli:
 
         return {key["name"]: key["publicKey"] for key in resp["keys"]}
 
+    def indexed_keys(self, wallet_name: str) -> dict[str, str]:
+        """
+        Same as list_keys, but read from the wallet state in memory, without calling the wallet binary.
+        Keys created outside of this client are visible only after resync_keys.
+        """
+        keys = self._state.keys(wallet_name)
+        if keys is None:
+            logging.warning(f"Wallet {wallet_name} is not in the wallet state, resync its keys")
+            return {}
+
+        return keys
+
+    def resync_keys(self, wallet_name: str) -> dict[str, str]:
+        """
+        List keys with the wallet binary and store them in the wallet state.
+        """
+        self._state.reload()
+        keys = self.list_keys(wallet_name)
+        if keys != self._state.keys(wallet_name):
+            logging.info(f"Keys of the {wallet_name} wallet changed outside of the wallet state, updating the state")
+            self._state.sync_keys(wallet_name, keys)
+
+        return keys
+
     def create_wallet(self, wallet_name: str):
         wallets = self.list_wallets()
 
@@ -1,9 +1,11 @@
 import os
+import copy
 import json
 import multiprocessing
 
 
 from dataclasses import dataclass
+from typing import Optional
 
 
 def default_wallet_struct(public_key: str, recovery_passphrase: str) -> dict:
@@ -75,9 +77,17 @@ def vega_wallet_state_from_file(path: str) -> VegaWalletStateType:
 
 
 class WalletStateService:
+    """
+    Wallets and keys created by the bots. The state is kept in memory, it is
+    loaded from the state file once and updated on every change. Changes are
+    written to the file, merged with its current content.
+    """
+
     def __init__(self, path: str):
         self._path = path
         self._mutex = multiprocessing.Lock()
+        self._state = None
+        self._struct = None
 
     def _load_state(self) -> dict:
         state = {}
@@ -94,6 +104,23 @@ class WalletStateService:
         with open(self._path, "w+") as outfile:
             outfile.write(json_object)
 
+        self._state = state
+        self._struct = None
+
+    def _cached_state(self) -> dict:
+        if self._state is None:
+            self._state = self._load_state()
+
+        return self._state
+
+    def reload(self):
+        """
+        Re-read the state file, e.g: after it has been changed by another process.
+        """
+        with self._mutex:
+            self._state = self._load_state()
+            self._struct = None
+
     def add_wallet(self, wallet_name: str, public_key: str, recovery_phrase: str):
         with self._mutex:
             state = self._load_state()
@@ -120,9 +147,48 @@ class WalletStateService:
             state["wallets"][wallet_name]["keys"][public_key] = default_key_struct(key_name, public_key, index)
             self._save_state(state)
 
+    def sync_keys(self, wallet_name: str, keys: dict[str, str]):
+        """
+        Replace keys of the wallet with keys(name -> public key) listed by the wallet,
+        in the order of their derivation.
+        """
+        with self._mutex:
+            state = self._load_state()
+            if not "wallets" in state:
+                state["wallets"] = {}
+
+            if not wallet_name in state["wallets"]:
+                state["wallets"][wallet_name] = default_wallet_struct("", "")
+
+            state["wallets"][wallet_name]["keys"] = {
+                public_key: default_key_struct(key_name, public_key, index)
+                for index, (key_name, public_key) in enumerate(keys.items())
+            }
+            self._save_state(state)
+
     def state_as_json(self) -> dict:
         with self._mutex:
-            return self._load_state()
+            return copy.deepcopy(self._cached_state())
 
     def state_as_struct(self) -> VegaWalletStateType:
-        return vega_wallet_state_from_json(self.state_as_json())
+        """
+        Returns the parsed state, shared by all callers until the next change. Must not be modified.
+        """
+        with self._mutex:
+            if self._struct is None:
+                self._struct = vega_wallet_state_from_json(self._cached_state())
+
+            return self._struct
+
+    def keys(self, wallet_name: str) -> Optional[dict[str, str]]:
+        """
+        Returns keys(name -> public key) of the wallet, or None when the wallet is not in the state.
+        """
+        wallet_state = self.state_as_struct().get(wallet_name, None)
+        if wallet_state is None:
+            return None
+
+        return {
+            key.name: key.public_key
+            for key in sorted(wallet_state.keys.values(), key=lambda key_state: key_state.index)
+        }
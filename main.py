@@ -2,14 +2,25 @@ import os
 import logging
 import argparse
 import bots.http.app
+import bots.api.datanode
+import bots.api.datanode_async
 
 from bots.services.multiprocessing import service_manager
 from bots.services.scenario import services_from_config
 from bots.http.traders_handler import from_config as traders_from_config
 from bots.services.vega_wallet import from_config as wallet_from_config
+from bots.services.endpoints_monitor import from_config as endpoints_monitor_from_config
+from bots.services.accounts_stream import from_config as accounts_stream_from_config
+from bots.services.traders_cache import from_config as traders_cache_from_config
+from bots.services.market_catalog import from_config as market_catalog_from_config
+from bots.http.endpoints_handler import Endpoints
+from bots.http.traders_changes_handler import TradersChanges, TradersChangesStream
+from bots.http.topups_handler import TradersTopUps
+from bots.http.metrics_handler import Metrics
+from bots.api.accounts import BalanceIndex
 from bots.vega_sim.scenario_wallet import from_config as scenario_wallet_from_config
 from bots.config.environment import check_env_variables
-from bots.api.datanode import check_market_exists, get_statistics, get_healthy_endpoints
+from bots.api.datanode import check_market_exists, get_statistics
 from bots.tools.github import download_and_unzip_github_asset
 from bots.config.types import load_network_config, read_bots_config
 from bots.wallet.cli import VegaWalletCli
@@ -28,11 +39,22 @@ def main():
         load_network_config(config.network_config_file, config.devops_network_name, config.work_dir)
     )
     bots.http.app.configure_flask(config.debug)
+    bots.api.datanode.configure(
+        config.datanode,
+        (
+            os.path.join(config.work_dir, "datanode-cache", config.devops_network_name)
+            if config.datanode.catalog_snapshot
+            else None
+        ),
+        config.network_config.api.grpc.hosts,
+    )
+    bots.api.datanode_async.configure(config.datanode)
 
     scenarios_config = config.scenarios
 
     rest_api_endpoints = config.network_config.api.rest.hosts
-    healthy_rest_endpoints = get_healthy_endpoints(rest_api_endpoints)
+    endpoints_monitor = endpoints_monitor_from_config(config.datanode, rest_api_endpoints)
+    healthy_rest_endpoints = endpoints_monitor.healthy_endpoints()
     if len(healthy_rest_endpoints) < 1:
         raise Exception("There is no healthy rest data-node in the network")
 
@@ -73,20 +95,54 @@ def main():
 
 
     scenario_wallets = dict()
+    balance_index = BalanceIndex() if config.datanode.accounts_stream else None
     try:
         check_env_variables()
         check_market_exists(healthy_rest_endpoints, required_market_names)
         scenario_wallets = scenario_wallet_from_config(config.scenarios, cli_wallet)
-        traders_svc = traders_from_config(config, cli_wallet, scenario_wallets, tokens_list)
+        market_catalog = market_catalog_from_config(config.datanode, endpoints_monitor.healthy_endpoints)
+        traders_svc = traders_from_config(
+            config, cli_wallet, scenario_wallets, tokens_list, endpoints_monitor, balance_index, market_catalog
+        )
+        endpoints_svc = Endpoints(endpoints_monitor)
+        metrics_svc = Metrics()
+        traders_changes_svc = TradersChanges(traders_svc)
+        traders_topups_svc = TradersTopUps(traders_svc, config.traders_cache.topup_fraction)
         bots.http.app.handler(path="/traders", handler_func=lambda: traders_svc.serve())
+        bots.http.app.handler(path="/traders/changes", handler_func=lambda: traders_changes_svc.serve())
+        bots.http.app.handler(path="/traders/topups", handler_func=lambda: traders_topups_svc.serve())
+        if config.traders_cache.changes_stream:
+            traders_changes_stream_svc = TradersChangesStream(
+                traders_svc, config.traders_cache.changes_stream_heartbeat
+            )
+            bots.http.app.handler(
+                path="/traders/changes/stream", handler_func=lambda: traders_changes_stream_svc.serve()
+            )
+        bots.http.app.handler(path="/endpoints", handler_func=lambda: endpoints_svc.serve())
+        bots.http.app.handler(path="/metrics", handler_func=lambda: metrics_svc.serve())
     except Exception as e:
         logging.error(str(e))
         return
 
     services = [
         wallet_from_config(config.wallet),
+        endpoints_monitor,
+        market_catalog,
     ]
 
+    if not balance_index is None:
+        services.append(
+            accounts_stream_from_config(
+                config.datanode,
+                balance_index,
+                endpoints_monitor.healthy_endpoints,
+                traders_svc.tracked_parties,
+            )
+        )
+
+    if config.traders_cache.background_refresh:
+        services.append(traders_cache_from_config(config.traders_cache, traders_svc))
+
     services += services_from_config(
         config.vega_market_sim_network_name,
         scenario_wallets,
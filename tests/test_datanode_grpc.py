@@ -0,0 +1,161 @@
+import unittest
+
+from concurrent import futures
+from typing import Optional
+
+try:
+    import grpc
+
+    from vega_sim.proto.vega import assets_pb2, markets_pb2, vega_pb2
+    from vega_sim.proto.data_node.api.v2 import trading_data_pb2, trading_data_pb2_grpc
+    from bots.api.datanode_grpc import GrpcDataNodeClient
+except ImportError:
+    # grpc and the vega protos come with vega_sim
+    grpc = None
+
+
+PAGE_SIZE = 2
+
+
+def _page(nodes: list, pagination: any, connection_type: any, edge_type: any) -> any:
+    """
+    Returns the connection with nodes after the cursor of the pagination, cursors are node positions.
+    """
+    start = int(pagination.after) + 1 if pagination.HasField("after") else 0
+    first = pagination.first if pagination.HasField("first") else PAGE_SIZE
+    page_nodes = nodes[start : start + first]
+
+    return connection_type(
+        edges=[edge_type(node=node, cursor=str(start + idx)) for idx, node in enumerate(page_nodes)],
+        page_info=trading_data_pb2.PageInfo(
+            has_next_page=start + first < len(nodes),
+            has_previous_page=start > 0,
+            start_cursor=str(start),
+            end_cursor=str(start + len(page_nodes) - 1),
+        ),
+    )
+
+
+if not grpc is None:
+
+    class StandInTradingDataService(trading_data_pb2_grpc.TradingDataServiceServicer):
+        """
+        In-process TradingDataService serving fixed markets, assets and accounts in pages.
+        """
+
+        def __init__(self):
+            self.markets = [
+                markets_pb2.Market(
+                    id=f"market-{idx}",
+                    state=markets_pb2.Market.STATE_ACTIVE,
+                    tradable_instrument=markets_pb2.TradableInstrument(
+                        instrument=markets_pb2.Instrument(
+                            name=f"MARKET{idx}",
+                            metadata=markets_pb2.InstrumentMetadata(tags=["base:BTC", "quote:USDT"]),
+                            perpetual=markets_pb2.Perpetual(settlement_asset="usdt"),
+                        )
+                    ),
+                )
+                for idx in range(5)
+            ]
+            self.assets = [
+                assets_pb2.Asset(
+                    id=asset_id,
+                    details=assets_pb2.AssetDetails(
+                        symbol=asset_id.upper(),
+                        decimals=6,
+                        erc20=assets_pb2.ERC20(contract_address=f"0x{asset_id}"),
+                    ),
+                )
+                for asset_id in ["usdt", "usdc", "weth"]
+            ]
+            self.accounts = [
+                trading_data_pb2.AccountBalance(
+                    owner=f"party-{idx}",
+                    balance=str(10**18 * (idx + 1)),
+                    asset="usdt" if idx % 2 == 0 else "weth",
+                    market_id="" if idx % 3 == 0 else "market-0",
+                    type=vega_pb2.ACCOUNT_TYPE_GENERAL if idx % 3 == 0 else vega_pb2.ACCOUNT_TYPE_MARGIN,
+                )
+                for idx in range(7)
+            ]
+
+        def ListMarkets(self, request, context):
+            return trading_data_pb2.ListMarketsResponse(
+                markets=_page(
+                    self.markets, request.pagination, trading_data_pb2.MarketConnection, trading_data_pb2.MarketEdge
+                )
+            )
+
+        def ListAssets(self, request, context):
+            return trading_data_pb2.ListAssetsResponse(
+                assets=_page(
+                    self.assets, request.pagination, trading_data_pb2.AssetsConnection, trading_data_pb2.AssetEdge
+                )
+            )
+
+        def ListAccounts(self, request, context):
+            accounts = [
+                account
+                for account in self.accounts
+                if (len(request.filter.asset_id) < 1 or account.asset == request.filter.asset_id)
+                and (len(request.filter.party_ids) < 1 or account.owner in request.filter.party_ids)
+            ]
+
+            return trading_data_pb2.ListAccountsResponse(
+                accounts=_page(
+                    accounts, request.pagination, trading_data_pb2.AccountsConnection, trading_data_pb2.AccountEdge
+                )
+            )
+
+
+@unittest.skipIf(grpc is None, "grpc and vega_sim are not installed")
+class GrpcDataNodeClientTest(unittest.TestCase):
+    def setUp(self):
+        self.service = StandInTradingDataService()
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        trading_data_pb2_grpc.add_TradingDataServiceServicer_to_server(self.service, self.server)
+        port = self.server.add_insecure_port("localhost:0")
+        self.server.start()
+
+        self.client = GrpcDataNodeClient([f"localhost:{port}"], timeout=5.0)
+
+    def tearDown(self):
+        self.server.stop(None)
+
+    def test_markets_follow_pagination_in_rest_shape(self):
+        markets = list(self.client.get_markets())
+
+        self.assertEqual([market["id"] for market in markets], [f"market-{idx}" for idx in range(5)])
+        self.assertEqual(markets[0]["state"], "STATE_ACTIVE")
+        self.assertEqual(markets[0]["tradableInstrument"]["instrument"]["name"], "MARKET0")
+        self.assertEqual(markets[0]["tradableInstrument"]["instrument"]["metadata"]["tags"], ["base:BTC", "quote:USDT"])
+        self.assertEqual(markets[0]["tradableInstrument"]["instrument"]["perpetual"]["settlementAsset"], "usdt")
+
+    def test_assets_follow_pagination_in_rest_shape(self):
+        assets = list(self.client.get_assets())
+
+        self.assertEqual([asset["id"] for asset in assets], ["usdt", "usdc", "weth"])
+        self.assertEqual(assets[0]["details"]["symbol"], "USDT")
+        self.assertEqual(assets[0]["details"]["decimals"], "6")
+        self.assertEqual(assets[0]["details"]["erc20"]["contractAddress"], "0xusdt")
+
+    def test_accounts_are_converted_like_rest_accounts(self):
+        accounts = list(self.client.iter_accounts(asset_id="usdt", page_size=1))
+
+        self.assertEqual([account.owner for account in accounts], ["party-0", "party-2", "party-4", "party-6"])
+        self.assertEqual(accounts[0].balance, 10**18)
+        self.assertEqual(accounts[0].market_id, "")
+        self.assertEqual(accounts[0].type, "ACCOUNT_TYPE_GENERAL")
+        self.assertEqual(accounts[1].market_id, "market-0")
+        self.assertEqual(accounts[1].type, "ACCOUNT_TYPE_MARGIN")
+
+    def test_accounts_filtered_by_parties(self):
+        accounts = list(self.client.iter_accounts(parties=["party-1", "party-3"]))
+
+        self.assertEqual(sorted(account.owner for account in accounts), ["party-1", "party-3"])
+        self.assertTrue(all(account.asset == "weth" for account in accounts))
+
+
+if __name__ == "__main__":
+    unittest.main()
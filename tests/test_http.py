@@ -0,0 +1,66 @@
+import socket
+import threading
+import time
+import unittest
+
+import requests
+
+from bots.api.http import HttpClient
+
+
+class StalledServer:
+    """
+    Accepts connections and never responds.
+    """
+
+    def __init__(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(8)
+        self._connections: list[socket.socket] = []
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._socket.getsockname()[1]}/api/v2/markets"
+
+    @property
+    def accepted(self) -> int:
+        return len(self._connections)
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            self._connections.append(conn)
+
+    def close(self):
+        self._socket.close()
+        for conn in self._connections:
+            conn.close()
+
+
+class HttpClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StalledServer()
+        self.client = HttpClient(connect_timeout=1.0, read_timeout=0.3, retries=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def test_stalled_endpoint_costs_one_read_timeout(self):
+        started = time.monotonic()
+        with self.assertRaises(requests.RequestException):
+            self.client.get(self.server.url)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(self.server.accepted, 1)
+        self.assertLess(elapsed, 0.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+
+from bots.http.traders_history import TradersDiff, TradersHistory, diff_traders
+
+
+def _trader(balance: float) -> dict[str, any]:
+    return {"pubKey": "p", "parameters": {"wantedTokens": [{"balance": balance}]}}
+
+
+class DiffTradersTest(unittest.TestCase):
+    def test_added_changed_and_removed(self):
+        unchanged = _trader(1.0)
+        old = {"a": unchanged, "b": _trader(2.0), "c": _trader(3.0)}
+        new = {"a": unchanged, "b": _trader(20.0), "d": _trader(4.0)}
+
+        diff = diff_traders(old, new)
+
+        self.assertEqual(diff.added, {"d": _trader(4.0)})
+        self.assertEqual(diff.changed, {"b": _trader(20.0)})
+        self.assertEqual(diff.removed, {"c"})
+
+    def test_equal_traders_are_not_changed(self):
+        diff = diff_traders({"a": _trader(1.0)}, {"a": _trader(1.0)})
+
+        self.assertTrue(diff.is_empty())
+
+
+class TradersDiffMergeTest(unittest.TestCase):
+    def test_change_of_added_trader_stays_added(self):
+        diff = TradersDiff(added={"a": _trader(1.0)})
+        diff.merge(TradersDiff(changed={"a": _trader(2.0)}))
+
+        self.assertEqual(diff.added, {"a": _trader(2.0)})
+        self.assertEqual(diff.changed, {})
+
+    def test_removal_of_added_trader_drops_it(self):
+        diff = TradersDiff(added={"a": _trader(1.0)})
+        diff.merge(TradersDiff(removed={"a"}))
+
+        self.assertTrue(diff.is_empty())
+
+    def test_added_back_trader_is_changed(self):
+        diff = TradersDiff(removed={"a"})
+        diff.merge(TradersDiff(added={"a": _trader(2.0)}))
+
+        self.assertEqual(diff.changed, {"a": _trader(2.0)})
+        self.assertEqual(diff.added, {})
+        self.assertEqual(diff.removed, set())
+
+    def test_removal_of_changed_trader_is_removed(self):
+        diff = TradersDiff(changed={"a": _trader(2.0)})
+        diff.merge(TradersDiff(removed={"a"}))
+
+        self.assertEqual(diff.changed, {})
+        self.assertEqual(diff.removed, {"a"})
+
+    def test_add_remove_add_chain(self):
+        diff = TradersDiff()
+        diff.merge(TradersDiff(added={"a": _trader(1.0)}))
+        diff.merge(TradersDiff(removed={"a"}))
+        diff.merge(TradersDiff(added={"a": _trader(3.0)}))
+
+        self.assertEqual(diff.added, {"a": _trader(3.0)})
+        self.assertEqual(diff.changed, {})
+        self.assertEqual(diff.removed, set())
+
+
+class TradersHistoryTest(unittest.TestCase):
+    def setUp(self):
+        # versions: 1 - a, 2 - a, b, 3 - b changed, 4 - a removed
+        self.history = TradersHistory(max_size=2)
+        self.snapshots = [
+            {"a": _trader(1.0)},
+            {"a": _trader(1.0), "b": _trader(2.0)},
+            {"a": _trader(1.0), "b": _trader(3.0)},
+            {"b": _trader(3.0)},
+        ]
+
+        previous = {}
+        for snapshot in self.snapshots:
+            self.history.record(diff_traders(previous, snapshot), snapshot)
+            previous = snapshot
+
+    def test_current_version_has_no_changes(self):
+        changes = self.history.changes_since(4)
+
+        self.assertEqual(changes.version, 4)
+        self.assertFalse(changes.as_dict()["full"])
+        self.assertTrue(changes.diff.is_empty())
+
+    def test_changes_merged_over_versions_in_history(self):
+        changes = self.history.changes_since(2)
+
+        self.assertEqual(changes.diff.changed, {"b": _trader(3.0)})
+        self.assertEqual(changes.diff.removed, {"a"})
+        self.assertEqual(changes.diff.added, {})
+
+    def test_oldest_base_version_still_in_history(self):
+        # the oldest kept diff is 3, it applies on top of version 2
+        self.assertIsNotNone(self.history.changes_since(2).diff)
+        self.assertIsNone(self.history.changes_since(1).diff)
+
+    def test_full_snapshot_for_unknown_versions(self):
+        for since in [None, -1, 0, 1, 5]:
+            changes = self.history.changes_since(since)
+
+            self.assertIsNone(changes.diff)
+            self.assertEqual(changes.as_dict(), {"version": 4, "full": True, "traders": self.snapshots[-1]})
+
+    def test_empty_history(self):
+        history = TradersHistory(max_size=2)
+
+        self.assertTrue(history.changes_since(0).diff.is_empty())
+        self.assertIsNone(history.changes_since(1).diff)
+
+    def test_history_without_diffs(self):
+        history = TradersHistory(max_size=0)
+        history.record(diff_traders({}, self.snapshots[0]), self.snapshots[0])
+
+        self.assertIsNone(history.changes_since(0).diff)
+        self.assertTrue(history.changes_since(1).diff.is_empty())
+        self.assertEqual(history.changes_since(0).as_dict(), {"version": 1, "full": True, "traders": self.snapshots[0]})
+
+    def test_wait_for_newer(self):
+        self.assertEqual(self.history.wait_for_newer(3, timeout=0.0), 4)
+        self.assertEqual(self.history.wait_for_newer(4, timeout=0.01), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()